@@ -0,0 +1,144 @@
+"""
+In-memory index of the structured server attributes (scrape.ATTRIBUTE_COLUMNS),
+used to filter quick_search.
+
+Every attribute is a numpy column aligned with the lexical index's doc ids, so a
+filter compiles to a few vectorized comparisons that yield one boolean mask. The
+mask is handed to the searches themselves (BM25 scoring and, mapped to vector rows,
+the vector index), so a filtered query ranks only matching servers and returns a
+full page of them in one pass.
+"""
+import sqlite3
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Filter keys accepted by quick_search and batch_search
+FILTERS = {
+    "source": "list (or lists) the server is scraped from, e.g. 'punkpeye', 'metorial', 'wong2'",
+    "official": "true for official implementations only",
+    "docker": "true for servers with a published Docker image",
+    "language": "implementation language (or list of them), e.g. 'python', 'typescript'",
+    "min_stars": "minimum number of GitHub stars",
+    "requires_api_key": "false for servers that need no API key (servers not known either way never match)",
+    "validated_within_days": "link checked successfully within this many days",
+}
+COLUMNS = ("sources", "official", "docker", "language", "stars", "requires_api_key", "validated_at")
+# Result fields quick_search can return for each server, see AttributeIndex.describe
+ATTRIBUTE_FIELDS = set(COLUMNS)
+DAY = 86400
+
+
+def _names(value, key: str) -> List[str]:
+    values = [value] if isinstance(value, str) else value
+    if not isinstance(values, (list, tuple)) or not all(isinstance(v, str) for v in values):
+        raise ValueError(f"Filter '{key}' takes a string or a list of strings")
+    return [v.strip().lower() for v in values]
+
+
+def _flag(value, key: str) -> bool:
+    if not isinstance(value, bool):
+        raise ValueError(f"Filter '{key}' takes true or false")
+    return value
+
+
+def _number(value, key: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Filter '{key}' takes a number")
+    return value
+
+
+class AttributeIndex:
+    def __init__(self, names: Sequence[str], rows: Dict[str, tuple]):
+        """
+        Args:
+            names: server names in doc id order.
+            rows: name -> values of COLUMNS; servers missing here get no attributes.
+        """
+        empty = (None,) * len(COLUMNS)
+        values = [rows.get(name, empty) for name in names]
+        self.doc_ids = {name: i for i, name in enumerate(names)}
+
+        self.sources: Dict[str, np.ndarray] = {}
+        for doc_id, row in enumerate(values):
+            for source in filter(None, (row[0] or "").split(",")):
+                if source not in self.sources:
+                    self.sources[source] = np.zeros(len(names), dtype=bool)
+                self.sources[source][doc_id] = True
+        self.official = np.array([bool(row[1]) for row in values], dtype=bool)
+        self.docker = np.array([bool(row[2]) for row in values], dtype=bool)
+        self.languages = sorted({row[3] for row in values if row[3]})
+        codes = {lang: i for i, lang in enumerate(self.languages)}
+        self.language = np.array([codes.get(row[3], -1) for row in values], dtype=np.int32)
+        self.stars = np.array([-1 if row[4] is None else row[4] for row in values], dtype=np.int64)
+        self.api_key = np.array([-1 if row[5] is None else row[5] for row in values], dtype=np.int8)
+        self.validated_at = np.array([row[6] or 0 for row in values], dtype=np.int64)
+        self._values = values
+
+    @classmethod
+    def from_db(cls, db_path: str, names: Sequence[str]) -> "AttributeIndex":
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(f"SELECT name, {', '.join(COLUMNS)} FROM servers").fetchall()
+        except sqlite3.OperationalError:
+            # Database from before the attribute columns: nothing to filter on
+            rows = []
+        conn.close()
+        return cls(names, {row[0]: row[1:] for row in rows})
+
+    def __len__(self):
+        return len(self.official)
+
+    def mask(self, filters: Optional[dict]) -> Optional[np.ndarray]:
+        """
+        Boolean mask over doc ids of the servers matching every filter, or None
+        when there are no filters. Raises ValueError for unknown or malformed filters.
+        """
+        if not filters:
+            return None
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s) {', '.join(sorted(unknown))}; known: {', '.join(FILTERS)}")
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in filters.items():
+            if value is None:
+                continue
+            if key == "source":
+                match = np.zeros(len(self), dtype=bool)
+                for source in _names(value, key):
+                    if source in self.sources:
+                        match |= self.sources[source]
+                mask &= match
+            elif key == "official":
+                mask &= self.official == _flag(value, key)
+            elif key == "docker":
+                mask &= self.docker == _flag(value, key)
+            elif key == "language":
+                codes = [self.languages.index(lang) for lang in _names(value, key) if lang in self.languages]
+                mask &= np.isin(self.language, codes)
+            elif key == "min_stars":
+                mask &= self.stars >= _number(value, key)
+            elif key == "requires_api_key":
+                mask &= self.api_key == int(_flag(value, key))
+            elif key == "validated_within_days":
+                mask &= self.validated_at >= time.time() - _number(value, key) * DAY
+        return mask
+
+    def describe(self, name: str) -> dict:
+        """
+        Attributes of one server, in the form quick_search returns them.
+        """
+        doc_id = self.doc_ids.get(name)
+        if doc_id is None:
+            return {}
+        sources, official, docker, language, stars, api_key, validated_at = self._values[doc_id]
+        return {
+            "sources": [s for s in (sources or "").split(",") if s],
+            "official": bool(official),
+            "docker": bool(docker),
+            "language": language,
+            "stars": stars,
+            "requires_api_key": None if api_key is None else bool(api_key),
+            "validated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(validated_at)) if validated_at else None,
+        }
@@ -0,0 +1,95 @@
+"""
+Synthetic server catalogues of any size, in the same SQLite schema as db/server_list.db.
+
+Names, descriptions and URLs are drawn from a fixed vocabulary with a seeded RNG,
+so a given size always produces the same catalogue.
+"""
+import random
+import sqlite3
+
+from scrape import ATTRIBUTE_COLUMNS, create_db_and_table, normalize_url
+
+TOPICS = (
+    "weather", "github", "slack", "postgres", "mysql", "redis", "kubernetes", "docker", "email",
+    "calendar", "payments", "stripe", "search", "browser", "scraping", "pdf", "images", "video",
+    "audio", "maps", "finance", "stocks", "crypto", "notes", "notion", "jira", "linear", "figma",
+    "aws", "gcp", "azure", "terraform", "sentry", "grafana", "logs", "metrics", "filesystem",
+    "shell", "git", "sqlite", "mongodb", "elasticsearch", "vector", "embeddings", "translation",
+    "spotify", "youtube", "twitter", "reddit", "discord", "telegram", "whatsapp", "sms", "ocr",
+)
+VERBS = (
+    "query", "search", "manage", "create", "monitor", "analyze", "read", "write", "sync",
+    "fetch", "summarize", "automate", "deploy", "inspect", "convert", "schedule", "index",
+)
+NOUNS = (
+    "records", "issues", "messages", "tables", "files", "events", "documents", "dashboards",
+    "pipelines", "tickets", "repositories", "channels", "forecasts", "invoices", "contacts",
+)
+QUALIFIERS = (
+    "with natural language", "through the official API", "using OAuth", "in real time",
+    "for AI agents", "without an API key", "via REST", "with caching", "securely", "in bulk",
+)
+SOURCES = ("punkpeye", "metorial", "wong2")
+LANGUAGES = ("python", "typescript", "go", "rust", "java", None)
+
+
+def make_servers(n: int, seed: int = 0):
+    """
+    Yield n (name, description, url) tuples.
+    """
+    rng = random.Random(seed)
+    for i in range(n):
+        topic = rng.choice(TOPICS)
+        other = rng.choice(TOPICS)
+        owner = f"owner{rng.randrange(max(1, n // 4))}"
+        repo = f"{topic}-{other}-mcp-{i}"
+        description = (
+            f"{rng.choice(VERBS).capitalize()} {topic} {rng.choice(NOUNS)} and "
+            f"{rng.choice(VERBS)} {other} {rng.choice(NOUNS)} {rng.choice(QUALIFIERS)}."
+        )
+        yield f"{owner}/{repo}", description, f"https://github.com/{owner}/{repo}"
+
+
+def make_attributes(n: int, seed: int = 0):
+    """
+    Yield n tuples of filterable attributes (scrape.ATTRIBUTE_COLUMNS, in order).
+    """
+    rng = random.Random(seed)
+    now = 1754000000
+    for _ in range(n):
+        yield (
+            ",".join(rng.sample(SOURCES, rng.randint(1, 2))),
+            int(rng.random() < 0.05),
+            int(rng.random() < 0.2),
+            rng.choice(LANGUAGES),
+            int(rng.paretovariate(1.2)) - 1,
+            rng.choice((0, 1, None)),
+            now - rng.randrange(90 * 86400),
+        )
+
+
+def write_catalogue(db_path: str, n: int, seed: int = 0):
+    create_db_and_table(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        f"INSERT INTO servers (name, description, url, url_key, {', '.join(ATTRIBUTE_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * 11)})",
+        (server + (normalize_url(server[2]),) + attrs
+         for server, attrs in zip(make_servers(n, seed), make_attributes(n, seed))),
+    )
+    conn.commit()
+    conn.close()
+
+
+def sample_queries(n: int, seed: int = 1):
+    """
+    Free-text queries in the style agents send, plus some exact server names.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for i in range(n):
+        if i % 10 == 9:
+            queries.append(f"{rng.choice(TOPICS)}-{rng.choice(TOPICS)}-mcp")
+        else:
+            queries.append(f"{rng.choice(VERBS)} {rng.choice(TOPICS)} {rng.choice(NOUNS)}")
+    return queries
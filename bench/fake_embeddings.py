@@ -0,0 +1,37 @@
+"""
+Deterministic, offline stand-in for the embedding API, for benchmarks.
+
+Tokens are hashed into a fixed number of dimensions (the "hashing trick") and the
+result is L2-normalized, so texts sharing words end up close together. Select it with
+EMBEDDING_PROVIDER=bench.fake_embeddings:HashEmbeddings.
+"""
+import hashlib
+import os
+import re
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DIM = int(os.getenv("BENCH_EMBEDDING_DIM", 384))
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashEmbeddings(Embeddings):
+    def __init__(self, dim: int = DIM):
+        self.dim = dim
+        self.model = f"hash-{dim}"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for tok in TOKEN_RE.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
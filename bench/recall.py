@@ -0,0 +1,135 @@
+"""
+Recall against exact search versus latency and memory, for every INDEX_TYPE.
+
+    uv run python -m bench.recall                         # 50k servers
+    uv run python -m bench.recall --size 1000000 --json recall.json
+
+Embeds a synthetic catalogue with the offline hash embeddings, writes it once as a
+flat index and then builds each approximate index type over the same vectors. For
+every type it reports build time, bytes per vector of the ANN index, p50/p99 search
+latency and recall@k, with and without the exact re-ranking step.
+
+Recall counts a returned row as correct if it is no farther from the query than the
+exact k-th neighbour, so rows tied at the same distance are interchangeable (the
+synthetic catalogue has many of them). Search parameters come from the environment
+(HNSW_EF_SEARCH, IVF_NPROBE, ANN_RERANK, ...), so they can be tuned run by run.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import vector_index
+from bench.catalogue import make_servers, sample_queries
+from bench.fake_embeddings import HashEmbeddings
+from bench.run import summarize
+
+ANN_TYPES = [t for t in vector_index.INDEX_TYPES if t != "flat"]
+
+
+def build_flat(path: str, size: int, embeddings) -> float:
+    servers = [(i, *server) for i, server in enumerate(make_servers(size))]
+    start = time.perf_counter()
+    blocks = (
+        np.asarray(embeddings.embed_documents([d for _, _, d, _ in servers[i:i + vector_index.WRITE_CHUNK]]),
+                   dtype=np.float32)
+        for i in range(0, size, vector_index.WRITE_CHUNK)
+    )
+    vector_index.write_index(path, servers, embeddings.dim, blocks)
+    return time.perf_counter() - start
+
+
+def link_copy(src: str, dst: str):
+    # The ANN index is an extra file next to the same vectors, so hard links suffice
+    os.makedirs(dst)
+    for name in (vector_index.VECTORS_FILE, vector_index.NORMS_FILE, vector_index.META_FILE):
+        os.link(os.path.join(src, name), os.path.join(dst, name))
+
+
+def measure(index, queries: np.ndarray, top_k: int, truth) -> dict:
+    latencies, hits = [], 0
+    wall_start = time.perf_counter()
+    for query, exact in zip(queries, truth):
+        t = time.perf_counter()
+        found = index.search(query[None, :], top_k)[0]
+        latencies.append(time.perf_counter() - t)
+        # Distances from the flat index, so quantization error can't inflate recall
+        limit = exact[-1][1] + 1e-5
+        q = query.astype(np.float64)
+        hits += sum(1 for i, _ in found if float(np.sum((index.vectors[i] - q) ** 2)) <= limit)
+    result = summarize(latencies, time.perf_counter() - wall_start)
+    result["recall"] = round(hits / (len(truth) * top_k), 4)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=ANN_TYPES, choices=ANN_TYPES)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    embeddings = HashEmbeddings()
+    queries = np.asarray(embeddings.embed_documents(sample_queries(args.queries)), dtype=np.float32)
+    workdir = tempfile.mkdtemp(prefix="bench-recall-")
+    try:
+        flat_dir = os.path.join(workdir, "flat")
+        os.makedirs(flat_dir)
+        print(f"embedding {args.size} servers ...", flush=True)
+        embed_seconds = build_flat(flat_dir, args.size, embeddings)
+        flat = vector_index.VectorIndex(flat_dir)
+        truth = [flat.search(q[None, :], args.top_k)[0] for q in queries]
+        results = {"flat": measure(flat, queries, args.top_k, truth)}
+        results["flat"]["bytes_per_vector"] = embeddings.dim * 4
+        print(f"flat: {json.dumps(results['flat'])}", flush=True)
+
+        for index_type in args.types:
+            path = os.path.join(workdir, index_type)
+            link_copy(flat_dir, path)
+            start = time.perf_counter()
+            built = vector_index.build_ann(path, index_type)
+            build_seconds = time.perf_counter() - start
+            if built != index_type:
+                print(f"{index_type}: catalogue below ANN_MIN_ROWS, skipped", flush=True)
+                continue
+            index = vector_index.VectorIndex(path)
+            reranked = measure(index, queries, args.top_k, truth)
+            index.rerank = 1
+            raw = measure(index, queries, args.top_k, truth)
+            with open(os.path.join(path, vector_index.ANN_META_FILE), encoding="utf-8") as f:
+                params = json.load(f)
+            results[index_type] = {
+                "params": params,
+                "build_seconds": round(build_seconds, 3),
+                "bytes_per_vector": round(os.path.getsize(os.path.join(path, vector_index.ANN_FILE)) / len(index), 1),
+                "reranked": reranked,
+                "no_rerank": raw,
+            }
+            index.close()
+            print(f"{index_type}: {json.dumps(results[index_type])}", flush=True)
+        flat.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'type':<8} {'recall':>8} {'no rerank':>10} {'p50 ms':>8} {'p99 ms':>8} {'bytes/vec':>10} {'build s':>8}")
+    for name, r in results.items():
+        main_run = r.get("reranked", r)
+        print(f"{name:<8} {main_run['recall']:>8} {r.get('no_rerank', main_run)['recall']:>10} "
+              f"{main_run['p50_ms']:>8} {main_run['p99_ms']:>8} {r['bytes_per_vector']:>10} "
+              f"{r.get('build_seconds', 0):>8}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"size": args.size, "dim": embeddings.dim, "embed_seconds": round(embed_seconds, 3),
+                       "search_params": {k: getattr(vector_index, k) for k in
+                                         ("HNSW_EF_SEARCH", "IVF_NPROBE", "ANN_RERANK")},
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
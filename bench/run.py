@@ -0,0 +1,273 @@
+"""
+Offline benchmark suite: index build, cold start, search latency/throughput and
+README fetching, on synthetic catalogues.
+
+    uv run python -m bench.run                          # 2k and 50k servers
+    uv run python -m bench.run --sizes 2000 50000 1000000 --json after.json
+    uv run python -m bench.run --json after.json --compare before.json
+
+Embeddings come from bench.fake_embeddings and GitHub from bench.standin, so no API
+key or network is needed and runs are reproducible. Every measurement runs in a fresh
+process, so cold-start times and peak RSS are not polluted by earlier steps.
+Results are printed and, with --json, written in a machine-readable form that
+--compare diffs against a previous run (e.g. from another commit).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_PROVIDER = "bench.fake_embeddings:HashEmbeddings"
+RESULT_PREFIX = "BENCH_RESULT "
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def summarize(latencies: list, wall: float) -> dict:
+    latencies = sorted(latencies)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    return {
+        "count": len(latencies),
+        "p50_ms": round(pick(0.50), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_per_s": round(len(latencies) / wall, 1),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Child processes (run with cwd = the benchmark's working directory)
+# -----------------------------------------------------------------------------
+
+def child_build(args) -> dict:
+    from bench.catalogue import write_catalogue
+    from scrape import DB_PATH, generate_embeddings
+
+    os.makedirs("db", exist_ok=True)
+    start = time.perf_counter()
+    write_catalogue(DB_PATH, args.size)
+    catalogue_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    generate_embeddings(DB_PATH)
+    return {
+        "catalogue_seconds": round(catalogue_seconds, 3),
+        "index_build_seconds": round(time.perf_counter() - start, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def child_search(args) -> dict:
+    start = time.perf_counter()
+    import server
+    import search_index
+    import_seconds = time.perf_counter() - start
+    search_index.load_now()
+    cold_start_seconds = time.perf_counter() - start
+    if search_index.get_index() is None:
+        raise RuntimeError(search_index.status())
+
+    from bench.catalogue import sample_queries
+    queries = sample_queries(args.queries)
+
+    # Sequential: latency of one quick_search body, serialization included
+    latencies = []
+    wall_start = time.perf_counter()
+    for query in queries:
+        t = time.perf_counter()
+        server._quick_search(query, 10, None, 0.0, None)
+        latencies.append(time.perf_counter() - t)
+    sequential = summarize(latencies, time.perf_counter() - wall_start)
+
+    # Concurrent: the async tool, through the bounded executor
+    async def concurrent():
+        latencies = []
+
+        async def one(query):
+            t = time.perf_counter()
+            await server.quick_search(query)
+            latencies.append(time.perf_counter() - t)
+
+        wall_start = time.perf_counter()
+        for i in range(0, len(queries), args.concurrency):
+            await asyncio.gather(*(one(q) for q in queries[i:i + args.concurrency]))
+        return summarize(latencies, time.perf_counter() - wall_start)
+
+    return {
+        "import_seconds": round(import_seconds, 3),
+        "cold_start_seconds": round(cold_start_seconds, 3),
+        "search_sequential": sequential,
+        "search_concurrent": asyncio.run(concurrent()),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def child_readme(args) -> dict:
+    import readme_fetcher
+    from bench.standin import StandIn
+
+    standin = StandIn(latency=args.latency)
+    base = standin.start()
+    readme_fetcher.RAW_BASE = base
+    readme_fetcher.API_BASE = base
+    # Mix of repos found on the first guess, the second guess and only via the API
+    repos = [(f"owner{i}", f"{('main', 'master', 'dev')[i % 3]}-repo{i}") for i in range(args.readmes)]
+
+    async def run_pass():
+        latencies = []
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def one(owner, repo):
+            async with sem:
+                t = time.perf_counter()
+                found = await readme_fetcher.get_readme(owner, repo, None, None)
+                latencies.append(time.perf_counter() - t)
+                if found is None:
+                    raise RuntimeError(f"no README for {owner}/{repo}")
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one(o, r) for o, r in repos))
+        return summarize(latencies, time.perf_counter() - wall_start)
+
+    async def main():
+        try:
+            cold_requests = standin.requests
+            cold = await run_pass()
+            cold["upstream_requests"] = standin.requests - cold_requests
+            warm_requests = standin.requests
+            warm = await run_pass()
+            warm["upstream_requests"] = standin.requests - warm_requests
+            return cold, warm
+        finally:
+            await readme_fetcher.aclose_client()
+
+    cold, warm = asyncio.run(main())
+    standin.stop()
+    return {"upstream_latency_ms": args.latency * 1000, "cold_cache": cold, "warm_cache": warm,
+            "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+
+CHILDREN = {"build": child_build, "search": child_search, "readme": child_readme}
+
+
+# -----------------------------------------------------------------------------
+# Driver
+# -----------------------------------------------------------------------------
+
+def run_child(name: str, workdir: str, args, extra: list) -> dict:
+    env = dict(
+        os.environ,
+        EMBEDDING_PROVIDER=FAKE_PROVIDER,
+        INDEX_RELOAD_INTERVAL="0",
+        README_CACHE_PATH=os.path.join(workdir, "db", "readme_cache.db"),
+        PYTHONPATH=os.pathsep.join(p for p in (REPO_DIR, os.environ.get("PYTHONPATH")) if p),
+    )
+    cmd = [sys.executable, "-m", "bench.run", "--child", name,
+           "--queries", str(args.queries), "--readmes", str(args.readmes),
+           "--concurrency", str(args.concurrency), "--latency", str(args.latency)] + extra
+    proc = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"bench child '{name}' failed:\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def flatten(prefix: str, value, out: dict):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            flatten(f"{prefix}.{k}" if prefix else k, v, out)
+    elif isinstance(value, (int, float)):
+        out[prefix] = value
+    return out
+
+
+def compare(before: dict, after: dict):
+    old = flatten("", before["results"], {})
+    new = flatten("", after["results"], {})
+    print(f"\n{'metric':<58} {before.get('commit') or 'before':>12} {after.get('commit') or 'after':>12} {'change':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        change = f"{(b - a) / a * 100:+.1f}%" if a else ""
+        print(f"{key:<58} {a:>12} {b:>12} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 50000])
+    parser.add_argument("--queries", type=int, default=500, help="search queries per catalogue size")
+    parser.add_argument("--readmes", type=int, default=300, help="distinct repos in the README benchmark")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in upstream latency in seconds")
+    parser.add_argument("--no-readme", action="store_true", help="skip the README benchmark")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to diff against")
+    parser.add_argument("--child", choices=sorted(CHILDREN), help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(RESULT_PREFIX + json.dumps(CHILDREN[args.child](args)), flush=True)
+        return
+
+    results = {}
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp(prefix=f"bench-{size}-")
+        try:
+            print(f"catalogue of {size} servers ...", flush=True)
+            results[str(size)] = {
+                "build": run_child("build", workdir, args, ["--size", str(size)]),
+                "search": run_child("search", workdir, args, []),
+            }
+            print(json.dumps(results[str(size)], indent=2), flush=True)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if not args.no_readme:
+        workdir = tempfile.mkdtemp(prefix="bench-readme-")
+        try:
+            os.makedirs(os.path.join(workdir, "db"))
+            print("README fetch ...", flush=True)
+            results["readme"] = run_child("readme", workdir, args, [])
+            print(json.dumps(results["readme"], indent=2), flush=True)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {k: getattr(args, k) for k in ("queries", "readmes", "concurrency", "latency")},
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
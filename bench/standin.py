@@ -0,0 +1,97 @@
+"""
+Local stand-in for raw.githubusercontent.com and api.github.com, so README fetches
+can be benchmarked without network access or rate limits.
+
+Every repo has a README of `readme_bytes` bytes on branch "main", except repos whose
+name starts with "master-" (README on "master") or "dev-" (only reachable through the
+API's default branch). Responses carry an ETag and honour If-None-Match. `latency`
+seconds are added to every response to imitate a real round trip.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+def _branch_for(repo: str) -> str:
+    for prefix in ("master", "dev"):
+        if repo.startswith(prefix + "-"):
+            return prefix
+    return "main"
+
+
+class StandIn:
+    def __init__(self, latency: float = 0.02, readme_bytes: int = 8192):
+        self.latency = latency
+        self.readme_bytes = readme_bytes
+        self.requests = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def readme(self, owner: str, repo: str) -> bytes:
+        line = f"Use the `{owner}/{repo}` server with API_KEY set in the env.\n".encode()
+        body = b"# " + repo.encode() + b"\n\n## Installation\n\n" + line * (self.readme_bytes // len(line) + 1)
+        return body[:self.readme_bytes]
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b"", etag: Optional[str] = None,
+                      content_type: str = "text/plain"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _readme(self, owner: str, repo: str):
+                body = standin.readme(owner, repo)
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, etag=etag)
+                self._send(200, body, etag)
+
+            def do_GET(self):
+                standin.requests += 1
+                if standin.latency:
+                    time.sleep(standin.latency)
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts[0] == "repos" and len(parts) >= 3:
+                    owner, repo = parts[1], parts[2]
+                    if len(parts) == 3:
+                        body = json.dumps({"default_branch": _branch_for(repo)}).encode()
+                        return self._send(200, body, content_type="application/json")
+                    if parts[3] in ("readme", "contents"):
+                        return self._readme(owner, repo)
+                elif len(parts) >= 4:
+                    owner, repo, branch = parts[0], parts[1], parts[2]
+                    if branch == _branch_for(repo) and branch != "dev":
+                        return self._readme(owner, repo)
+                self._send(404, b"404: Not Found")
+
+        return Handler
+
+    def start(self) -> str:
+        """
+        Serve on a free local port in a background thread. Returns the base URL.
+        """
+        # The default listen backlog of 5 drops connections under load (1s SYN retries)
+        server_class = type("StandInServer", (ThreadingHTTPServer,), {"request_queue_size": 256})
+        self._server = server_class(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
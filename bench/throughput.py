@@ -0,0 +1,161 @@
+"""
+Throughput of `quick_search` over streamable HTTP as the number of server workers grows.
+
+Starts `server.py --workers N` for each N against a copy of db/server_list.db (with
+the offline hash embeddings, so no API key or network is needed), drives it with
+`--concurrency` MCP clients for `--duration` seconds and reports requests per
+second and latency percentiles.
+
+    uv run python bench/throughput.py --workers 1 2 4 8 --concurrency 64 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_PROVIDER = "bench.fake_embeddings:HashEmbeddings"
+QUERIES = [
+    "weather forecast", "github issues", "postgres database", "slack messages",
+    "send email", "web scraping", "stock prices", "kubernetes cluster",
+    "image generation", "google calendar", "file system", "payments",
+]
+MCP_HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir: str, workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(port), EMBEDDING_PROVIDER=FAKE_PROVIDER, INDEX_RELOAD_INTERVAL="0",
+               PYTHONPATH=os.pathsep.join([REPO_DIR, os.environ.get("PYTHONPATH", "")]))
+    return subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, "server.py"), "--workers", str(workers)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base: str, workers: int, timeout: float = 120):
+    # /ready is answered by whichever worker accepts, so wait for a run of 200s
+    deadline = time.time() + timeout
+    streak = 0
+    while time.time() < deadline:
+        try:
+            streak = streak + 1 if httpx.get(f"{base}/ready", timeout=2).status_code == 200 else 0
+        except httpx.HTTPError:
+            streak = 0
+        if streak >= 4 * workers:
+            return
+        time.sleep(0.05)
+    raise TimeoutError(f"server at {base} not ready after {timeout}s")
+
+
+def rpc(method: str, params: dict, id_=None) -> dict:
+    msg = {"jsonrpc": "2.0", "method": method, "params": params}
+    if id_ is not None:
+        msg["id"] = id_
+    return msg
+
+
+def parse_reply(resp: httpx.Response) -> dict:
+    if resp.headers.get("content-type", "").startswith("text/event-stream"):
+        for line in resp.text.splitlines():
+            if line.startswith("data:"):
+                return json.loads(line[5:])
+        return {}
+    return resp.json()
+
+
+async def client(base: str, stop_at: float, latencies: list, errors: list, seed: int):
+    async with httpx.AsyncClient(base_url=base, headers=MCP_HEADERS, timeout=30) as http:
+        resp = await http.post("/mcp/", json=rpc("initialize", {
+            "protocolVersion": "2025-03-26", "capabilities": {},
+            "clientInfo": {"name": "bench", "version": "0"},
+        }, 0))
+        session = resp.headers.get("mcp-session-id")
+        headers = {"mcp-session-id": session} if session else {}
+        await http.post("/mcp/", json=rpc("notifications/initialized", {}), headers=headers)
+        i = seed
+        while time.perf_counter() < stop_at:
+            query = QUERIES[i % len(QUERIES)]
+            i += 1
+            start = time.perf_counter()
+            resp = await http.post("/mcp/", headers=headers, json=rpc(
+                "tools/call", {"name": "quick_search", "arguments": {"query": query}}, i))
+            elapsed = time.perf_counter() - start
+            reply = parse_reply(resp) if resp.status_code == 200 else {}
+            if "result" in reply and not reply["result"].get("isError"):
+                latencies.append(elapsed)
+            else:
+                errors.append(resp.status_code)
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+async def drive(base: str, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], []
+    stop_at = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(client(base, stop_at, latencies, errors, n) for n in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / wall,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--db", default=os.path.join(REPO_DIR, "db", "server_list.db"))
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-throughput-")
+    os.makedirs(os.path.join(workdir, "db"))
+    shutil.copy(args.db, os.path.join(workdir, "db", "server_list.db"))
+    results = []
+    try:
+        print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}  (cpus: {os.cpu_count()})")
+        for workers in args.workers:
+            port = free_port()
+            base = f"http://127.0.0.1:{port}"
+            server = start_server(workdir, workers, port)
+            try:
+                wait_ready(base, workers)
+                result = {"workers": workers, "concurrency": args.concurrency,
+                          **asyncio.run(drive(base, args.concurrency, args.duration))}
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            results.append(result)
+            print(f"{workers:>7} {result['rps']:>9.1f} {result['p50_ms']:>8.1f} "
+                  f"{result['p99_ms']:>8.1f} {result['errors']:>6}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "throughput", "cpus": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Embedding helpers shared by server.py and scrape.py.
+
+`get_embeddings()` picks the embedding backend from EMBEDDING_PROVIDER:
+  - "openai" (default): OpenAIEmbeddings, needs OPENAI_API_KEY and network access
+  - "local": a sentence-transformers model loaded from LOCAL_EMBEDDING_MODEL and run
+    on the CPU, so indexing and search work without any external API
+
+`CachedEmbeddings` wraps any LangChain `Embeddings` and memoizes `embed_query`
+results in a bounded LRU keyed on the normalized query text, so agents repeating
+"weather" or "github" are answered without an embedding round trip. The cache can
+optionally be persisted to SQLite so it survives restarts.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+# A local directory (for air-gapped deployments) or a Hugging Face model id
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# "torch" or "onnx"; the ONNX runtime is usually the faster of the two on CPU
+LOCAL_EMBEDDING_BACKEND = os.getenv("LOCAL_EMBEDDING_BACKEND", "torch")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+# Written next to the FAISS index so we never query it with a different model
+INDEX_STAMP_FILE = "embedding_model.txt"
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 4096))
+# Unset keeps the cache in memory only
+QUERY_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH")
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Case-fold, collapse whitespace and drop surrounding punctuation so that
+    "Weather ", "weather" and "weather?" share one cache entry.
+    """
+    return _WS_RE.sub(" ", query.lower()).strip(" \t\n.,;:!?\"'`")
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    CPU-only sentence-transformers backend. Texts are encoded in batches of
+    `batch_size` and vectors are L2-normalized.
+    """
+
+    def __init__(self, model_path: str = LOCAL_EMBEDDING_MODEL, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 backend: str = LOCAL_EMBEDDING_BACKEND):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_PROVIDER=local needs sentence-transformers. Install it with `uv sync --extra local`."
+            ) from e
+        self.model = model_path
+        self.batch_size = batch_size
+        try:
+            self._model = SentenceTransformer(model_path, device="cpu", backend=backend)
+        except ImportError as e:
+            # The onnx backend needs optimum and onnxruntime on top of sentence-transformers
+            raise ImportError(
+                f"LOCAL_EMBEDDING_BACKEND={backend} is missing a dependency ({e}). "
+                "Install it with `uv sync --extra local`."
+            ) from e
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def get_embeddings(provider: Optional[str] = None) -> Embeddings:
+    """
+    Build the embedding backend selected by `provider` (defaults to EMBEDDING_PROVIDER).
+    Besides "openai" and "local", "package.module:ClassName" loads any `Embeddings`
+    class that takes no arguments.
+    """
+    provider = provider or EMBEDDING_PROVIDER
+    if ":" in provider:
+        import importlib
+        module, _, name = provider.partition(":")
+        return getattr(importlib.import_module(module), name)()
+    provider = provider.lower()
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        # Already batched: embed_documents sends up to 1000 texts per request
+        return OpenAIEmbeddings()
+    if provider == "local":
+        return LocalEmbeddings()
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER '{provider}', expected 'openai', 'local' or 'module:Class'")
+
+
+def embedding_id(embeddings: Embeddings) -> str:
+    """
+    Identify the model behind `embeddings`, e.g. "OpenAIEmbeddings:text-embedding-ada-002".
+    """
+    inner = getattr(embeddings, "inner", embeddings)
+    return f"{type(inner).__name__}:{getattr(inner, 'model', '')}"
+
+
+def write_index_stamp(index_dir: str, embeddings: Embeddings):
+    with open(os.path.join(index_dir, INDEX_STAMP_FILE), "w", encoding="utf-8") as f:
+        f.write(embedding_id(embeddings))
+
+
+def index_matches(index_dir: str, embeddings: Embeddings) -> bool:
+    """
+    True if the index in `index_dir` was built with the same model as `embeddings`.
+    Indexes built before stamps existed are OpenAI ones.
+    """
+    stamp = os.path.join(index_dir, INDEX_STAMP_FILE)
+    if not os.path.exists(stamp):
+        return type(getattr(embeddings, "inner", embeddings)).__name__ == "OpenAIEmbeddings"
+    with open(stamp, encoding="utf-8") as f:
+        return f.read().strip() == embedding_id(embeddings)
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, max_size: int = QUERY_CACHE_SIZE,
+                 persist_path: Optional[str] = QUERY_CACHE_PATH, namespace: Optional[str] = None):
+        self.inner = inner
+        self.max_size = max_size
+        # Vectors from different models must never be mixed up
+        self.namespace = namespace or getattr(inner, "model", None) or type(inner).__name__
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if persist_path:
+            self._open_store(persist_path)
+
+    def _open_store(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Shared by all server worker processes
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS query_embeddings (
+                namespace TEXT NOT NULL,
+                query TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL,
+                PRIMARY KEY (namespace, query)
+            )
+        ''')
+        self._conn.commit()
+        rows = self._conn.execute('''
+            SELECT query, vector FROM query_embeddings WHERE namespace = ?
+            ORDER BY created_at DESC LIMIT ?
+        ''', (self.namespace, self.max_size)).fetchall()
+        # Oldest first so the most recent entries end up at the MRU end
+        for query, blob in reversed(rows):
+            self._cache[query] = array("f", blob).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        vector = self.inner.embed_query(key)
+        self._store({key: vector})
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries at once. Cached ones are served from the LRU and all
+        the misses go to the backend in a single `embed_documents` call.
+        """
+        keys = [normalize_query(text) for text in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = vector
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            fresh = dict(zip(missing, self.inner.embed_documents(missing)))
+            self._store(fresh)
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+    def _store(self, vectors: dict):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._cache[key] = vector
+                self._cache.move_to_end(key)
+            evicted = []
+            while len(self._cache) > self.max_size:
+                evicted.append(self._cache.popitem(last=False)[0])
+            if self._conn is not None:
+                now = time.time()
+                self._conn.executemany('''
+                    INSERT OR REPLACE INTO query_embeddings (namespace, query, vector, created_at)
+                    VALUES (?, ?, ?, ?)
+                ''', [(self.namespace, key, array("f", vector).tobytes(), now) for key, vector in vectors.items()])
+                self._conn.executemany(
+                    'DELETE FROM query_embeddings WHERE namespace = ? AND query = ?',
+                    [(self.namespace, q) for q in evicted]
+                )
+                self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._cache),
+            "max_entries": self.max_size,
+            "persistent": self._conn is not None,
+        }
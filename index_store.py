@@ -0,0 +1,82 @@
+"""
+On-disk layout of `db/faiss_index`.
+
+Each build is written to its own version directory, and a small CURRENT file names
+the live one:
+
+    db/faiss_index/
+        CURRENT          -> "v20250801T120000-k3j9x2"
+        v20250801T120000-k3j9x2/vectors.npy, norms.npy, meta.db, [ann.faiss, ann.json,] embedding_model.txt
+        v20250731T120000-a81bq0/...   (previous version, kept for readers mid-load)
+
+Publishing a new version is a single `os.replace` of CURRENT, which is atomic, so
+a reader either sees the old index or the new one, never a half-written mix.
+The files inside a version directory (see vector_index) never change after publishing.
+"""
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v"
+
+
+def current_version(index_dir: str) -> Optional[str]:
+    """
+    Name of the live version directory, or None if nothing was published yet.
+    """
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_path(index_dir: str) -> Optional[str]:
+    """
+    Directory holding the live index files, or None if there is no index yet.
+    """
+    version = current_version(index_dir)
+    if version is None:
+        return None
+    path = os.path.join(index_dir, version)
+    return path if os.path.isdir(path) else None
+
+
+def new_version_dir(index_dir: str) -> str:
+    """
+    Create an empty staging directory for the next version.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    prefix = f"{VERSION_PREFIX}{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-"
+    path = tempfile.mkdtemp(prefix=prefix, dir=index_dir)
+    # mkdtemp creates 0700 directories; the server may run as another user
+    os.chmod(path, 0o755)
+    return path
+
+
+def publish(index_dir: str, version_dir: str):
+    """
+    Atomically make `version_dir` the live index, then clean up old versions.
+    The version that was live until now is kept, since a reader may still be loading it.
+    """
+    previous = current_version(index_dir)
+    tmp = os.path.join(index_dir, f"{CURRENT_FILE}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(version_dir))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(index_dir, CURRENT_FILE))
+
+    keep = {os.path.basename(version_dir), previous}
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if name.startswith(VERSION_PREFIX) and os.path.isdir(path) and name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+    # Files from the pre-versioning, pickle-based layout are superseded now
+    for name in ("index.faiss", "index.pkl", "embedding_model.txt"):
+        path = os.path.join(index_dir, name)
+        if os.path.isfile(path):
+            os.remove(path)
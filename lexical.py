@@ -0,0 +1,123 @@
+"""
+Lexical (BM25) search over the server catalogue, used alongside the FAISS index.
+
+Embeddings are good at "a server that handles payments" but weak at exact names
+like "MCPJungle" or "imagen3". This module keeps a small in-memory inverted index
+over each server's name, description and URL path, and `fused_scores`
+(reciprocal rank fusion) merges its ranking with the vector ranking.
+"""
+import heapq
+import math
+import re
+import sqlite3
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+from urllib.parse import urlparse
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Name matches count more than description matches
+NAME_WEIGHT = 3
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def name_key(text: str) -> str:
+    """
+    Collapse a name to lowercase alphanumerics, so "MCP Jungle", "mcp-jungle"
+    and "MCPJungle" all compare equal.
+    """
+    return "".join(tokenize(text))
+
+
+class BM25Index:
+    def __init__(self, entries: Sequence[dict], k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            entries: dicts with "name", "description" and "url" keys.
+        """
+        self.entries = list(entries)
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_len: List[int] = []
+        # name_key -> doc ids, for exact-name lookups
+        self.names: Dict[str, List[int]] = defaultdict(list)
+
+        for doc_id, entry in enumerate(self.entries):
+            name = entry.get("name") or ""
+            url_path = urlparse(entry.get("url") or "").path
+            tokens = tokenize(name) * NAME_WEIGHT + tokenize(entry.get("description") or "") + tokenize(url_path)
+            tf: Dict[str, int] = defaultdict(int)
+            for tok in tokens:
+                tf[tok] += 1
+            for tok, count in tf.items():
+                self.postings[tok].append((doc_id, count))
+            self.doc_len.append(len(tokens))
+
+            # "owner/repo" and plain "repo" both count as the server's name. Not the
+            # repo without "mcp"/"server": that turns "weather-mcp" into "weather",
+            # and plain topic words would then look like exact names
+            repo = name.rsplit("/", 1)[-1]
+            for key in dict.fromkeys((name_key(name), name_key(repo))):
+                if key:
+                    self.names[key].append(doc_id)
+
+        n = len(self.entries)
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            tok: math.log(1 + (n - len(posts) + 0.5) / (len(posts) + 0.5))
+            for tok, posts in self.postings.items()
+        }
+
+    @classmethod
+    def from_db(cls, db_path: str) -> "BM25Index":
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute("SELECT name, description, url FROM servers").fetchall()
+        conn.close()
+        return cls([{"name": n, "description": d, "url": u} for n, d, u in rows])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def exact_matches(self, query: str) -> List[int]:
+        """
+        Doc ids whose name (owner/repo or repo) is exactly `query`, modulo case and
+        punctuation.
+        """
+        return list(self.names.get(name_key(query), []))
+
+    def search(self, query: str, top_k: int = 20, allowed=None) -> List[Tuple[int, float]]:
+        """
+        BM25-ranked (doc_id, score) pairs for `query`, best first.
+        `allowed` (indexable by doc id, e.g. a boolean mask) limits the ranking to
+        the docs it allows.
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        for tok in set(tokenize(query)):
+            posts = self.postings.get(tok)
+            if not posts:
+                continue
+            idf = self.idf[tok]
+            for doc_id, tf in posts:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / self.avg_len)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        items = scores.items() if allowed is None else ((d, s) for d, s in scores.items() if allowed[d])
+        return heapq.nlargest(top_k, items, key=lambda kv: kv[1])
+
+
+def fused_scores(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Merge several best-first rankings of keys into one, scoring each key by
+    sum(1 / (k + rank)) over the rankings it appears in.
+    Scores are scaled to [0, 1], where 1 means first in every ranking.
+    Returns (key, score) pairs, best first.
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] += 1.0 / (k + rank + 1)
+    best = len(rankings) / (k + 1)
+    return sorted(((key, score / best) for key, score in scores.items()), key=lambda kv: kv[1], reverse=True)
@@ -0,0 +1,112 @@
+"""
+Concurrent link checking for scrape.update_db and maintain.maintain_db.
+
+URLs are checked with HEAD requests (falling back to a body-less GET for servers
+that reject HEAD) over one pooled client. A global semaphore bounds the number of
+requests in flight, each host gets its own request-rate budget, and 429/5xx or
+connection errors are retried with exponential backoff.
+"""
+import asyncio
+import os
+import random
+from typing import Dict, Iterable, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from scrape import HEADER
+
+CONCURRENCY = int(os.getenv("LINK_CHECK_CONCURRENCY", 32))
+PER_HOST_RPS = float(os.getenv("LINK_CHECK_PER_HOST_RPS", 10))
+RETRIES = int(os.getenv("LINK_CHECK_RETRIES", 3))
+BATCH_SIZE = int(os.getenv("LINK_CHECK_BATCH_SIZE", 200))
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Some servers answer HEAD with these even though GET works
+HEAD_UNSUPPORTED = {403, 405, 501}
+
+
+class LinkResult(NamedTuple):
+    status: Optional[int]  # None if the request never got a response
+    error: Optional[str] = None
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host to at most `rate` per second.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot: Dict[str, float] = {}
+
+    async def wait(self, host: str):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self.next_slot.get(host, now))
+        self.next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _headers_for(url: str) -> dict:
+    # Only GitHub should ever see our token
+    host = urlsplit(url).hostname or ""
+    if host == "github.com" or host.endswith(".github.com"):
+        return HEADER
+    return {"User-Agent": HEADER["User-Agent"]}
+
+
+def _backoff(attempt: int, resp: Optional[httpx.Response]) -> float:
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), 60.0)
+    return min(2 ** attempt, 30) + random.uniform(0, 0.5)
+
+
+async def _check(client: httpx.AsyncClient, url: str, sem: asyncio.Semaphore,
+                 limiter: HostRateLimiter, retries: int) -> LinkResult:
+    host = urlsplit(url).hostname or ""
+    headers = _headers_for(url)
+    result = LinkResult(None, "not checked")
+    async with sem:
+        for attempt in range(retries + 1):
+            resp = None
+            await limiter.wait(host)
+            try:
+                resp = await client.head(url, headers=headers)
+                if resp.status_code in HEAD_UNSUPPORTED:
+                    async with client.stream("GET", url, headers=headers) as resp:
+                        pass
+                result = LinkResult(resp.status_code)
+                if resp.status_code not in RETRY_STATUSES:
+                    return result
+            except httpx.HTTPError as e:
+                result = LinkResult(None, f"{type(e).__name__}: {e}")
+            if attempt < retries:
+                await asyncio.sleep(_backoff(attempt, resp))
+    return result
+
+
+async def check_urls_async(urls: Iterable[str], concurrency: int = CONCURRENCY,
+                           per_host_rps: float = PER_HOST_RPS, retries: int = RETRIES) -> Dict[str, LinkResult]:
+    urls = list(dict.fromkeys(urls))
+    sem = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(per_host_rps)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(http2=True, timeout=TIMEOUT, limits=limits, follow_redirects=True) as client:
+        results = await asyncio.gather(*(_check(client, url, sem, limiter, retries) for url in urls))
+    return dict(zip(urls, results))
+
+
+def check_urls(urls: Iterable[str], **kwargs) -> Dict[str, LinkResult]:
+    """
+    Check every URL concurrently. Returns {url: LinkResult}.
+    """
+    return asyncio.run(check_urls_async(urls, **kwargs))
+
+
+def batched(items: list, size: int = BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -1,25 +1,57 @@
-from scrape import DB_PATH, HEADER
-import requests
-import sqlite3
+from scrape import DB_PATH, connect_db, generate_embeddings
+import link_validator
+import repo_metadata
+import time
 
 
-def maintain_db(db_path):
-    conn = sqlite3.connect(db_path)
+def maintain_db(db_path, checked_since=None):
+    """
+    Drop servers whose link no longer resolves. Links are checked concurrently
+    and each batch is written in one transaction, by server id. Servers validated
+    at or after `checked_since` (e.g. by refresh_metadata) are not checked again.
+    """
+    conn = connect_db(db_path)
     c = conn.cursor()
-    c.execute('SELECT name, url FROM servers')
+    c.execute('SELECT id, name, url FROM servers WHERE validated_at IS NULL OR validated_at < ?',
+              (checked_since or float('inf'),))
     rows = c.fetchall()
-    for name, url in rows:
-        try:
-            response = requests.get(url, headers=HEADER, timeout=10)
-            if response.status_code != 200:
-                print(f"Removing {name} ({url}): HTTP {response.status_code}")
-                c.execute('DELETE FROM servers WHERE url = ?', (url,))
-        except Exception as e:
-            print(f"Error accessing {url}: {e}")
-            c.execute('DELETE FROM servers WHERE url = ?', (url,))
-    conn.commit()
+    for batch in link_validator.batched(rows):
+        results = link_validator.check_urls(url for _, _, url in batch)
+        to_delete = []
+        validated = []
+        now = int(time.time())
+        for server_id, name, url in batch:
+            status, error = results[url]
+            if status == 200:
+                validated.append((now, server_id))
+            elif status is None:
+                print(f"Error accessing {url}: {error}")
+                to_delete.append((server_id,))
+            elif status == 429:
+                # Still rate limited after retries, which says nothing about the link itself
+                print(f"Rate limited on {url}, keeping {name}")
+            else:
+                print(f"Removing {name} ({url}): HTTP {status}")
+                to_delete.append((server_id,))
+        with conn:
+            c.executemany('DELETE FROM servers WHERE id = ?', to_delete)
+            c.executemany('UPDATE servers SET validated_at = ? WHERE id = ?', validated)
     conn.close()
 
 
+def refresh_metadata(db_path):
+    """
+    Store stars, default branch, README path etc. of every GitHub-hosted server and
+    drop those whose repo is archived, in GraphQL batches.
+    """
+    repo_metadata.update_metadata(db_path, drop_archived=True)
+
+
 if __name__ == '__main__':
-    maintain_db(DB_PATH)
+    started = int(time.time())
+    # Repos found in the GraphQL batches count as checked, so only the other links
+    # (other hosts, repos GraphQL did not find) need a GET each
+    refresh_metadata(DB_PATH)
+    maintain_db(DB_PATH, checked_since=started)
+    # Drop the removed servers from the vector index too (no embedding calls needed)
+    generate_embeddings(DB_PATH)
@@ -0,0 +1,171 @@
+"""
+Minimal Prometheus-style metrics, rendered in the text exposition format by `/metrics`.
+
+    CALLS = Counter("mcp_tool_calls_total", "Tool calls", ("tool", "outcome"))
+    CALLS.inc(tool="quick_search", outcome="ok")
+
+    with stage("embedding"):          # timed into mcp_stage_seconds{tool, stage}
+        ...
+
+The tool label of `stage` comes from `current_tool`, which tool_executor sets for
+the duration of each tool call (including on its worker threads). Metrics are per
+process: with `--workers N` every worker reports its own.
+"""
+import bisect
+import contextlib
+import contextvars
+import json
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current_tool: contextvars.ContextVar = contextvars.ContextVar("current_tool", default="none")
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(n, "") for n in self.labels)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterable[str]:
+        return ()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, _ = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            counts[i] += 1
+            self._values[key][1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        yield
+        self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}"
+
+
+class Callback(_Metric):
+    """
+    A gauge or counter whose samples are read from `fn` at scrape time.
+    `fn` returns (label values, value) pairs.
+    """
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], fn: Callable, kind: str = "gauge"):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.fn = fn
+
+    def _samples(self):
+        try:
+            samples = list(self.fn())
+        except Exception as e:
+            print(f"Metric {self.name} failed: {e}")
+            return
+        for key, value in samples:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+STAGE_SECONDS = Histogram("mcp_stage_seconds", "Time spent per stage of a tool call", ("tool", "stage"))
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """
+    Time the block into mcp_stage_seconds for the current tool. Blocks that raise
+    (including cancelled races) are not recorded.
+    """
+    start = time.perf_counter()
+    yield
+    STAGE_SECONDS.observe(time.perf_counter() - start, tool=current_tool.get(), stage=name)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def log_sampled(event: str, rate: float, **fields):
+    """
+    Print one JSON log line for `event`, for a random `rate` fraction of calls.
+    """
+    if rate >= 1 or random.random() < rate:
+        print(json.dumps({"event": event, "ts": round(time.time(), 3), "sample_rate": rate, **fields}))
@@ -0,0 +1,160 @@
+"""
+Persistent README cache for `fetch_readme`.
+
+Entries live in a small SQLite file next to `db/server_list.db`, keyed by
+(owner, repo, branch, subpath) as parsed from the GitHub URL. Every entry keeps the
+ETag of the response it came from, so once the freshness window runs out it can be
+revalidated with If-None-Match: a 304 costs no body download and, on the GitHub API,
+no rate-limit quota. The table is bounded by entry count and total bytes and evicts
+the least recently used entries first.
+
+The file is shared by all worker processes, so every call may wait for the write
+lock: callers on an event loop should run these methods in a thread. Writes are kept
+rare anyway: access times are recorded with ACCESS_RESOLUTION granularity and the
+size limits are checked every EVICT_EVERY puts.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple
+
+CACHE_PATH = os.getenv("README_CACHE_PATH", "db/readme_cache.db")
+CACHE_TTL = float(os.getenv("README_CACHE_TTL", 300))
+CACHE_MAX_ENTRIES = int(os.getenv("README_CACHE_MAX_ENTRIES", 2000))
+CACHE_MAX_BYTES = int(float(os.getenv("README_CACHE_MAX_MB", 64)) * 1024 * 1024)
+# last_access is only rewritten once it is this old, so hits rarely need the write lock
+ACCESS_RESOLUTION = float(os.getenv("README_CACHE_ACCESS_RESOLUTION", 300))
+# Size limits are enforced every this many puts, so they can be exceeded by as many entries
+EVICT_EVERY = int(os.getenv("README_CACHE_EVICT_EVERY", 32))
+
+CacheKey = Tuple[str, str, str, str]
+
+
+class CachedReadme(NamedTuple):
+    content: str
+    branch: str
+    url: str  # where the content came from, used for revalidation
+    etag: Optional[str]
+    fetched_at: float
+
+
+def make_key(owner: str, repo: str, branch: Optional[str], subpath: Optional[str]) -> CacheKey:
+    # GitHub owner/repo names are case-insensitive; branches and paths are not.
+    return owner.lower(), repo.lower(), branch or "", (subpath or "").strip("/")
+
+
+class ReadmeCache:
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Shared by all server worker processes, so let readers and a writer overlap
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS readme_cache (
+                owner TEXT NOT NULL,
+                repo TEXT NOT NULL,
+                branch TEXT NOT NULL,
+                subpath TEXT NOT NULL,
+                resolved_branch TEXT,
+                url TEXT,
+                etag TEXT,
+                content TEXT,
+                size INTEGER,
+                fetched_at REAL,
+                last_access REAL,
+                PRIMARY KEY (owner, repo, branch, subpath)
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS readme_cache_lru ON readme_cache (last_access)')
+        self._conn.commit()
+
+    def is_fresh(self, entry: CachedReadme) -> bool:
+        return time.time() - entry.fetched_at < self.ttl
+
+    def get(self, key: CacheKey) -> Optional[CachedReadme]:
+        with self._lock:
+            row = self._conn.execute('''
+                SELECT content, resolved_branch, url, etag, fetched_at, last_access FROM readme_cache
+                WHERE owner = ? AND repo = ? AND branch = ? AND subpath = ?
+            ''', key).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - (row[5] or 0) > ACCESS_RESOLUTION:
+                self._conn.execute('''
+                    UPDATE readme_cache SET last_access = ?
+                    WHERE owner = ? AND repo = ? AND branch = ? AND subpath = ?
+                ''', (now, *key))
+                self._conn.commit()
+        return CachedReadme(*row[:5])
+
+    def put(self, key: CacheKey, content: str, branch: str, url: str, etag: Optional[str]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute('''
+                INSERT OR REPLACE INTO readme_cache
+                    (owner, repo, branch, subpath, resolved_branch, url, etag, content, size, fetched_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (*key, branch, url, etag, content, len(content.encode("utf-8")), now, now))
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self._evict()
+            self._conn.commit()
+
+    def touch(self, key: CacheKey):
+        """
+        Mark an entry as fresh again after a 304 Not Modified.
+        """
+        with self._lock:
+            self._conn.execute('''
+                UPDATE readme_cache SET fetched_at = ?
+                WHERE owner = ? AND repo = ? AND branch = ? AND subpath = ?
+            ''', (time.time(), *key))
+            self._conn.commit()
+
+    def delete(self, key: CacheKey):
+        with self._lock:
+            self._conn.execute('''
+                DELETE FROM readme_cache WHERE owner = ? AND repo = ? AND branch = ? AND subpath = ?
+            ''', key)
+            self._conn.commit()
+
+    def _evict(self):
+        count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM readme_cache').fetchone()
+        while count > self.max_entries or (total > self.max_bytes and count > 1):
+            row = self._conn.execute('''
+                SELECT rowid, size FROM readme_cache ORDER BY last_access ASC LIMIT 1
+            ''').fetchone()
+            self._conn.execute('DELETE FROM readme_cache WHERE rowid = ?', (row[0],))
+            count -= 1
+            total -= row[1]
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM readme_cache'
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
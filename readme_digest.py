@@ -0,0 +1,226 @@
+"""
+Per-server facts derived from READMEs offline, so agents can get them without
+downloading the README: whether an API key is needed, the environment variables
+it mentions, install commands, an example `mcpServers` config and a short summary.
+
+`update_digests` runs as a scrape step and stores one row per server in the
+readme_digests table of server_list.db; the `server_details` tool reads them back.
+READMEs go through readme_fetcher, so re-runs only revalidate cached copies.
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+API_KEY_PATTERN_RE = re.compile(
+    r"\b(?:api[-_ ]?key|apikey|x[-_]api[-_]key)\b",
+    re.IGNORECASE
+)
+# Where env var names show up: "env" blocks of configs, shell exports and flags, code
+ENV_VAR = r"([A-Z][A-Z0-9]*(?:_[A-Z0-9]+)+)"
+ENV_PATTERNS = [
+    re.compile(r'"' + ENV_VAR + r'"\s*:\s*"'),                   # "GITHUB_TOKEN": "..."
+    re.compile(r"(?:export|set|\$env:)\s+" + ENV_VAR + r"\s*="),  # export API_KEY=...
+    re.compile(r"(?:^|\s)" + ENV_VAR + r"=\S", re.MULTILINE),    # API_KEY=... npx ...
+    re.compile(r"(?:-e|--env)\s+" + ENV_VAR + r"\b"),            # docker run -e API_KEY
+    re.compile(r"\$\{?" + ENV_VAR + r"\}?"),                     # $API_KEY, ${API_KEY}
+    re.compile(r"(?:process\.env\.|os\.environ\[['\"]|getenv\(['\"])" + ENV_VAR),
+]
+INSTALL_RE = re.compile(
+    r"^\s*(?:\$\s*)?(?:npx|uvx|uv (?:add|pip|tool|run)|pipx?3? install|npm (?:install|i)\b|pnpm (?:add|install)"
+    r"|yarn (?:add|global)|bunx?|docker (?:run|pull)|go install|cargo install|brew install|smithery)\b.*$",
+    re.MULTILINE,
+)
+CODE_BLOCK_RE = re.compile(r"```[^\n]*\n(.*?)```", re.DOTALL)
+# Env vars like OPENWEATHER_API_KEY, which API_KEY_PATTERN_RE misses inside a longer name
+CREDENTIAL_VAR_RE = re.compile(r"_(?:API_?KEY|KEY|TOKEN|SECRET|PASSWORD)$")
+
+SUMMARY_CHARS = int(os.getenv("README_SUMMARY_CHARS", 600))
+MAX_ENV_VARS = 20
+MAX_INSTALL = 8
+MAX_CONFIG_CHARS = 2000
+# Digests older than this are recomputed on the next scrape
+DIGEST_MAX_AGE = float(os.getenv("README_DIGEST_MAX_AGE_DAYS", 7)) * 86400
+CONCURRENCY = int(os.getenv("README_DIGEST_CONCURRENCY", 16))
+
+
+def env_vars(text: str) -> List[str]:
+    names = {}
+    for pattern in ENV_PATTERNS:
+        for match in pattern.finditer(text):
+            names.setdefault(match.group(1), match.start())
+    return sorted(names, key=names.get)[:MAX_ENV_VARS]
+
+
+def install_commands(text: str) -> List[str]:
+    commands = []
+    for block in CODE_BLOCK_RE.findall(text):
+        for match in INSTALL_RE.finditer(block):
+            command = match.group(0).strip().lstrip("$").strip()
+            if command not in commands:
+                commands.append(command)
+    return commands[:MAX_INSTALL]
+
+
+def mcp_config(text: str) -> Optional[str]:
+    """
+    The first code block with an `mcpServers` config, if any.
+    """
+    for block in CODE_BLOCK_RE.findall(text):
+        if '"mcpServers"' in block or ('"servers"' in block and '"command"' in block):
+            return block.strip()[:MAX_CONFIG_CHARS]
+    return None
+
+
+def summarize(text: str, limit: int = SUMMARY_CHARS) -> str:
+    """
+    The README's opening prose (no headings, badges, tables or code), cut at `limit` chars.
+    """
+    text = CODE_BLOCK_RE.sub("", text)
+    text = re.sub(r"<!--.*?-->", "", text, flags=re.DOTALL)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"!\[[^\]]*\]\([^)]*\)", "", text)
+    text = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", text)
+    text = text.replace("**", "").replace("__", "")
+    paragraphs = []
+    for block in re.split(r"\n\s*\n", text):
+        lines = [ln.strip() for ln in block.splitlines() if ln.strip() and not ln.lstrip().startswith(("#", "|"))]
+        paragraph = " ".join(lines)
+        # Skip what is left of badge rows and separators
+        if sum(ch.isalpha() for ch in paragraph) < 20:
+            continue
+        paragraphs.append(paragraph)
+        if sum(len(p) for p in paragraphs) >= limit:
+            break
+    summary = "\n\n".join(paragraphs)
+    if len(summary) <= limit:
+        return summary
+    return summary[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def digest(text: str) -> dict:
+    names = env_vars(text)
+    return {
+        "requires_api_key": bool(API_KEY_PATTERN_RE.search(text)) or any(CREDENTIAL_VAR_RE.search(n) for n in names),
+        "env_vars": names,
+        "install": install_commands(text),
+        "mcp_config": mcp_config(text),
+        "summary": summarize(text),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Storage
+# -----------------------------------------------------------------------------
+COLUMNS = ("requires_api_key", "env_vars", "install", "mcp_config", "summary", "readme_url", "updated_at")
+
+
+def lookup(db_path: str, keys: List[str]) -> Dict[str, dict]:
+    """
+    Digests of the servers named by `keys` (server names or URLs), keyed by the key
+    they were asked for. Servers without a digest yet get their catalogue entry only.
+    """
+    from scrape import normalize_url
+
+    url_keys = [normalize_url(key) for key in keys]
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        placeholders = ",".join("?" * len(keys))
+        rows = conn.execute(f'''
+            SELECT s.name, s.url, s.description, {", ".join("d." + c for c in COLUMNS)}
+            FROM servers s LEFT JOIN readme_digests d ON d.name = s.name
+            WHERE s.name IN ({placeholders}) OR s.url_key IN ({placeholders})
+        ''', keys + url_keys).fetchall()
+    except sqlite3.OperationalError:
+        # Database not migrated yet (scrape has not run since the schema changed)
+        rows = [row + (None,) * len(COLUMNS) for row in conn.execute(
+            f"SELECT name, url, description FROM servers WHERE name IN ({placeholders}) OR url IN ({placeholders})",
+            keys + keys)]
+    finally:
+        conn.close()
+
+    found = {}
+    for name, url, description, api_key, env, install, config, summary, readme_url, updated_at in rows:
+        details = {"name": name, "url": url, "description": description}
+        if updated_at is not None:
+            details.update({
+                "requires_api_key": bool(api_key),
+                "env_vars": json.loads(env),
+                "install": json.loads(install),
+                "mcp_config": config,
+                "summary": summary,
+                "readme_url": readme_url,
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(updated_at)),
+            })
+        found[name] = details
+        found[normalize_url(url)] = details
+    return {key: found.get(key) or found[url_key] for key, url_key in zip(keys, url_keys)
+            if key in found or url_key in found}
+
+
+# -----------------------------------------------------------------------------
+# Scrape step
+# -----------------------------------------------------------------------------
+async def _digest_all(servers: List[tuple]) -> List[tuple]:
+    import readme_fetcher
+
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(name: str, url: str, branch: Optional[str], readme_path: Optional[str]):
+        parsed = readme_fetcher.parse_github_url(url)
+        if parsed is None:
+            return None
+        # Where repo_metadata found the README, if it ran
+        location = (parsed[2] or branch, readme_path) if readme_path and (parsed[2] or branch) else None
+        async with sem:
+            try:
+                found = await readme_fetcher.get_readme(*parsed, location)
+            except Exception as e:
+                print(f"README of {name} failed: {e}")
+                return None
+        if found is None:
+            return None
+        d = digest(found.content)
+        return (name, int(d["requires_api_key"]), json.dumps(d["env_vars"]), json.dumps(d["install"]),
+                d["mcp_config"], d["summary"], found.url, int(time.time()))
+
+    try:
+        results = await asyncio.gather(*(one(*server) for server in servers))
+    finally:
+        await readme_fetcher.aclose_client()
+    return [r for r in results if r is not None]
+
+
+def update_digests(db_path: str, full_refresh: bool = False):
+    """
+    Compute digests for servers that have none or an outdated one, and copy their
+    API-key flag to the `requires_api_key` attribute (the README beats the description).
+    """
+    from scrape import connect_db
+
+    conn = connect_db(db_path)
+    cutoff = time.time() - (0 if full_refresh else DIGEST_MAX_AGE)
+    servers = conn.execute('''
+        SELECT s.name, s.url, s.default_branch, s.readme_path FROM servers s
+        LEFT JOIN readme_digests d ON d.name = s.name
+        WHERE d.updated_at IS NULL OR d.updated_at < ?
+    ''', (cutoff,)).fetchall()
+    print(f"Digesting {len(servers)} READMEs")
+    rows = asyncio.run(_digest_all(servers))
+    with conn:
+        conn.executemany(f'''
+            INSERT INTO readme_digests (name, {", ".join(COLUMNS)})
+            VALUES ({", ".join("?" * (len(COLUMNS) + 1))})
+            ON CONFLICT(name) DO UPDATE SET {", ".join(f"{c} = excluded.{c}" for c in COLUMNS)}
+        ''', rows)
+        conn.execute('DELETE FROM readme_digests WHERE name NOT IN (SELECT name FROM servers)')
+        conn.execute('''
+            UPDATE servers SET requires_api_key =
+                (SELECT requires_api_key FROM readme_digests d WHERE d.name = servers.name)
+            WHERE name IN (SELECT name FROM readme_digests)
+        ''')
+    conn.close()
+    print(f"Stored {len(rows)} README digests, {len(servers) - len(rows)} READMEs not found")
@@ -0,0 +1,305 @@
+"""
+Async README fetching for the `fetch_readme` tool.
+
+All lookups share one pooled HTTP/2 client, so repeated calls reuse warm
+connections to raw.githubusercontent.com and api.github.com instead of paying a
+TLS handshake each time. When the branch is not part of the URL, the common
+branch names are requested in parallel and the first hit wins. Results are kept
+in a `ReadmeCache` and revalidated with conditional requests once they go stale,
+and identical lookups in flight at the same time share one upstream call.
+"""
+import asyncio
+import os
+from typing import Awaitable, Iterable, NamedTuple, Optional, Tuple
+
+import httpx
+
+import metrics
+from metrics import stage
+from readme_cache import ReadmeCache, make_key
+from scrape import HEADER
+from singleflight import SingleFlight
+
+RAW_BASE = "https://raw.githubusercontent.com"
+API_BASE = "https://api.github.com"
+DEFAULT_BRANCHES = ("main", "master")
+
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("README_MAX_CONNECTIONS", 100)),
+    max_keepalive_connections=int(os.getenv("README_MAX_KEEPALIVE", 20)),
+)
+
+UPSTREAM_RESPONSES = metrics.Counter(
+    "mcp_upstream_responses_total", "Responses from GitHub by host and status code", ("host", "status")
+)
+
+_client: Optional[httpx.AsyncClient] = None
+_cache: Optional[ReadmeCache] = None
+flight = SingleFlight("readme")
+
+
+class Readme(NamedTuple):
+    content: str
+    branch: str
+    url: str
+    etag: Optional[str]
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the shared AsyncClient, creating it on first use.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            headers=HEADER,
+            timeout=TIMEOUT,
+            limits=LIMITS,
+            follow_redirects=True,
+            event_hooks={"response": [_count_response]},
+        )
+    return _client
+
+
+async def _count_response(resp: httpx.Response):
+    UPSTREAM_RESPONSES.inc(host=resp.request.url.host, status=resp.status_code)
+
+
+def get_cache() -> ReadmeCache:
+    global _cache
+    if _cache is None:
+        _cache = ReadmeCache()
+    return _cache
+
+
+async def aclose_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def _api_headers(raw: bool = False) -> dict:
+    # The scrape HEADER always carries a bearer token, even an empty one, which the
+    # REST API rejects. Only authenticate API calls when a token is configured.
+    headers = {"User-Agent": HEADER["User-Agent"]}
+    token = os.getenv("GITHUB_TOKEN")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    headers["Accept"] = "application/vnd.github.raw" if raw else "application/vnd.github+json"
+    return headers
+
+
+def parse_github_url(url: str) -> Optional[Tuple[str, str, Optional[str], Optional[str]]]:
+    """
+    Parse a GitHub URL to extract owner, repo, branch (if present), and subpath.
+    Examples it understands:
+     - https://github.com/owner/repo
+     - https://github.com/owner/repo/
+     - https://github.com/owner/repo/tree/main/path/to/dir
+     - https://github.com/owner/repo/blob/main/path/to/README.md
+    Returns (owner, repo, branch, subpath) where branch/subpath may be None.
+    """
+    if "github.com/" not in url:
+        return None
+    # Remove protocol, query and fragment (e.g. "?tab=readme-ov-file#setup")
+    path = url.split("github.com/", 1)[1]
+    path = path.split("#", 1)[0].split("?", 1)[0]
+    path = path.strip().rstrip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    parts = path.split("/")
+
+    if len(parts) < 2:
+        return None
+    owner, repo = parts[0], parts[1]
+    branch = None
+    subpath = None
+    if len(parts) >= 3:
+        kind = parts[2]  # e.g., "tree" or "blob" or something else
+        if kind in ("tree", "blob") and len(parts) >= 4:
+            branch = parts[3]
+            if len(parts) >= 5:
+                subpath = "/".join(parts[4:])
+        else:
+            # Could be direct owner/repo/<something>; treat that as subpath on default branch
+            subpath = "/".join(parts[2:])
+    return owner, repo, branch, subpath
+
+
+def readme_path_for(subpath: Optional[str]) -> str:
+    """
+    Path of the README.md to look for, relative to the repo root.
+    """
+    if subpath:
+        normalized_subpath = subpath.rstrip("/").lstrip("/")
+        if normalized_subpath.lower().endswith("readme.md"):
+            return normalized_subpath
+        return f"{normalized_subpath}/README.md"
+    return "README.md"
+
+
+async def _first_success(attempts: Iterable[Awaitable[Optional[Readme]]]) -> Optional[Readme]:
+    """
+    Run the attempts concurrently and return the first non-None result.
+    Attempts still in flight are cancelled once a winner is found.
+    """
+    tasks = [asyncio.ensure_future(a) for a in attempts]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            try:
+                result = await fut
+            except Exception:
+                continue
+            if result is not None:
+                return result
+        return None
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+async def fetch_raw(owner: str, repo: str, branch: str, path: str) -> Optional[Readme]:
+    """
+    Fetch a file from raw.githubusercontent.com. Returns None unless it exists.
+    """
+    url = f"{RAW_BASE}/{owner}/{repo}/{branch}/{path}"
+    with stage("raw_fetch"):
+        resp = await get_client().get(url)
+    if resp.status_code == 200:
+        return Readme(resp.text, branch, url, resp.headers.get("ETag"))
+    return None
+
+
+async def fetch_default_branch(owner: str, repo: str) -> Optional[str]:
+    with stage("api_default_branch"):
+        resp = await get_client().get(f"{API_BASE}/repos/{owner}/{repo}", headers=_api_headers())
+    if resp.status_code == 200:
+        return resp.json().get("default_branch")
+    return None
+
+
+async def fetch_via_api(owner: str, repo: str, branch: Optional[str], path: str) -> Optional[Readme]:
+    """
+    Fallback through the contents API: first the README at `path`, then the root README.
+    """
+    params = {"ref": branch} if branch else None
+    with stage("api_contents"):
+        resp = await get_client().get(
+            f"{API_BASE}/repos/{owner}/{repo}/contents/{path}", headers=_api_headers(raw=True), params=params
+        )
+    if resp.status_code != 200:
+        # Last resort: root README, whatever its exact file name is
+        with stage("api_readme"):
+            resp = await get_client().get(
+                f"{API_BASE}/repos/{owner}/{repo}/readme", headers=_api_headers(raw=True), params=params
+            )
+    if resp.status_code == 200:
+        return Readme(resp.text, branch or "", str(resp.url), resp.headers.get("ETag"))
+    return None
+
+
+async def fetch_readme_text(owner: str, repo: str, branch: Optional[str], subpath: Optional[str],
+                            location: Optional[Tuple[str, str]] = None) -> Optional[Readme]:
+    """
+    Locate and download the README for (owner, repo, branch, subpath), bypassing the cache.
+    With the (branch, path) `location` stored in the catalogue that is a single fetch;
+    branches are only probed if it is unknown or out of date.
+
+    Returns None if no README could be found.
+    """
+    if location is not None:
+        try:
+            found = await fetch_raw(owner, repo, *location)
+        except httpx.HTTPError:
+            found = None
+        if found is not None:
+            return found
+    path = readme_path_for(subpath)
+    candidates = [branch] if branch else list(DEFAULT_BRANCHES)
+
+    found = await _first_success(fetch_raw(owner, repo, br, path) for br in candidates)
+    if found is not None:
+        return found
+
+    # Neither guess worked: ask the API for the default branch and try once more.
+    try:
+        if not branch:
+            branch = await fetch_default_branch(owner, repo)
+            if branch and branch not in candidates:
+                found = await fetch_raw(owner, repo, branch, path)
+                if found is not None:
+                    return found
+        return await fetch_via_api(owner, repo, branch, path)
+    except httpx.HTTPError:
+        return None
+
+
+async def revalidate(entry) -> Optional[Readme]:
+    """
+    Conditional GET against the URL a cached README came from.
+
+    Returns the entry unchanged on 304, the new content on 200 and None when the
+    resource is gone.
+    """
+    headers = _api_headers(raw=True) if entry.url.startswith(API_BASE) else {}
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    with stage("revalidate"):
+        resp = await get_client().get(entry.url, headers=headers)
+    if resp.status_code == 304:
+        return Readme(entry.content, entry.branch, entry.url, entry.etag)
+    if resp.status_code == 200:
+        return Readme(resp.text, entry.branch, entry.url, resp.headers.get("ETag"))
+    return None
+
+
+async def get_readme(owner: str, repo: str, branch: Optional[str], subpath: Optional[str],
+                     location: Optional[Tuple[str, str]] = None) -> Optional[Readme]:
+    """
+    Cached README lookup used by the `fetch_readme` tool.
+
+    Fresh entries are served without touching the network, stale ones are
+    revalidated with If-None-Match, and misses go through `fetch_readme_text`.
+    Concurrent lookups of the same README share one of these.
+    """
+    return await flight.do(make_key(owner, repo, branch, subpath), _get_readme, owner, repo, branch, subpath, location)
+
+
+async def _get_readme(owner: str, repo: str, branch: Optional[str], subpath: Optional[str],
+                      location: Optional[Tuple[str, str]]) -> Optional[Readme]:
+    cache = get_cache()
+    key = make_key(owner, repo, branch, subpath)
+    # The cache file is shared between workers, so its I/O can wait on a lock: keep it off the loop
+    with stage("cache_lookup"):
+        entry = await asyncio.to_thread(cache.get, key)
+
+    if entry is not None:
+        if cache.is_fresh(entry):
+            cache.hits += 1
+            return Readme(entry.content, entry.branch, entry.url, entry.etag)
+        try:
+            found = await revalidate(entry)
+        except httpx.HTTPError:
+            # Upstream unreachable: a stale README beats no README
+            cache.hits += 1
+            return Readme(entry.content, entry.branch, entry.url, entry.etag)
+        cache.revalidations += 1
+        if found is not None:
+            # Only an unchanged README was served by the cache; new content was downloaded
+            if found.content == entry.content:
+                cache.hits += 1
+                await asyncio.to_thread(cache.touch, key)
+            else:
+                cache.misses += 1
+                await asyncio.to_thread(cache.put, key, found.content, found.branch, found.url, found.etag)
+            return found
+        await asyncio.to_thread(cache.delete, key)
+
+    cache.misses += 1
+    found = await fetch_readme_text(owner, repo, branch, subpath, location)
+    if found is not None:
+        await asyncio.to_thread(cache.put, key, found.content, found.branch, found.url, found.etag)
+    return found
@@ -0,0 +1,124 @@
+"""
+Markdown README split into heading-aligned sections, for `fetch_readme` paging,
+section filters and the streaming /readme route.
+
+A section runs from its heading to the next heading of the same or a higher level,
+so selecting "Installation" also brings its subsections along. Text before the
+first heading is a section with an empty title. Headings inside code fences don't
+count.
+"""
+import hashlib
+import re
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+# Asking for one of these section names also matches headings with its synonyms
+SYNONYMS = {
+    "installation": ("install", "setup", "set up", "getting started", "quick start", "quickstart"),
+    "configuration": ("config", "settings", "options", "claude desktop", "cursor"),
+    "environment": ("environment", "env", "api key", "credentials", "authentication", "token"),
+    "usage": ("usage", "tools", "examples", "how to use"),
+}
+
+
+class Section(NamedTuple):
+    title: str
+    level: int  # 0 for the text before the first heading
+    text: str
+
+
+def split_sections(text: str) -> List[Section]:
+    """
+    Flat list of sections in document order; every section's text starts with its
+    heading line and stops at the next heading of any level.
+    """
+    sections = []
+    title, level, lines = "", 0, []
+    in_fence = False
+    for line in text.splitlines(keepends=True):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(line)
+        if match:
+            if lines:
+                sections.append(Section(title, level, "".join(lines)))
+            title, level, lines = match.group(2), len(match.group(1)), []
+        lines.append(line)
+    if lines:
+        sections.append(Section(title, level, "".join(lines)))
+    return sections
+
+
+def _terms(names: Sequence[str]) -> List[str]:
+    terms = []
+    for name in names:
+        name = name.strip().lower()
+        if not name:
+            continue
+        terms.append(name)
+        for key, synonyms in SYNONYMS.items():
+            if name == key or name in synonyms:
+                terms += [key, *synonyms]
+    return list(dict.fromkeys(terms))
+
+
+def select(sections: List[Section], names: Optional[Sequence[str]]) -> List[Section]:
+    """
+    Sections whose title contains any of `names` (or their synonyms), case-insensitively,
+    together with their subsections. All sections when `names` is empty.
+    """
+    if not names:
+        return sections
+    terms = _terms(names)
+    selected = []
+    depth = None  # level of the matched section we are inside of
+    for section in sections:
+        if depth is not None and (section.level == 0 or section.level > depth):
+            selected.append(section)
+            continue
+        depth = None
+        title = section.title.lower()
+        if section.level and any(term in title for term in terms):
+            selected.append(section)
+            depth = section.level
+    return selected
+
+
+def chunks(sections: List[Section], max_chars: int) -> Iterator[List[Section]]:
+    """
+    Pack consecutive sections into chunks of at most `max_chars` characters. A section
+    longer than that is split at line boundaries (and only there), its pieces keeping
+    the section's title.
+    """
+    chunk, size = [], 0
+    for section in sections:
+        pieces = [section]
+        if len(section.text) > max_chars:
+            pieces, piece = [], ""
+            for line in section.text.splitlines(keepends=True):
+                if piece and len(piece) + len(line) > max_chars:
+                    pieces.append(Section(section.title, section.level, piece))
+                    piece = ""
+                piece += line
+            if piece:
+                pieces.append(Section(section.title, section.level, piece))
+        for piece in pieces:
+            if chunk and size + len(piece.text) > max_chars:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(piece)
+            size += len(piece.text)
+    if chunk:
+        yield chunk
+
+
+def fingerprint(text: str) -> str:
+    """
+    Short content hash, so a cursor can tell that the README changed between pages.
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+
+
+def toc(sections: List[Section]) -> List[str]:
+    return ["#" * s.level + " " + s.title for s in sections if s.level]
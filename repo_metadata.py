@@ -0,0 +1,200 @@
+"""
+Repository metadata of GitHub-hosted servers from the GitHub GraphQL API: stars,
+primary language, default branch, README path, archived flag and last push.
+
+Repos are looked up about a hundred per query (one aliased `repository` field
+each), so enriching the whole catalogue takes a few dozen requests instead of one
+REST call per server. The README location lets `fetch_readme` make a single fetch
+instead of probing branches, and maintain.py drops archived repos and only GETs
+the links GraphQL could not vouch for. Needs GITHUB_TOKEN: the GraphQL API has no
+anonymous access.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from link_validator import RETRIES, RETRY_STATUSES, TIMEOUT, _backoff
+from readme_fetcher import API_BASE, _api_headers, parse_github_url
+
+# Repos per GraphQL query; GitHub allows up to 100 nodes per connection
+BATCH_SIZE = int(os.getenv("GITHUB_GRAPHQL_BATCH", 100))
+# Queries in flight at once; GitHub asks integrators not to hammer GraphQL concurrently
+CONCURRENCY = int(os.getenv("GITHUB_GRAPHQL_CONCURRENCY", 4))
+# GitHub language names that differ from the scrape.LEGEND tags
+LANGUAGE_ALIASES = {"c#": "csharp"}
+REPO_FIELDS = """
+    stargazerCount
+    isArchived
+    pushedAt
+    primaryLanguage { name }
+    defaultBranchRef { name }
+    object(expression: %s) { __typename ... on Tree { entries { name type } } }
+"""
+# Columns written by update_metadata
+COLUMNS = ("stars", "language", "default_branch", "readme_path", "archived", "pushed_at")
+
+
+def github_repo(url: str) -> Optional[Tuple[str, str]]:
+    """
+    (owner, repo) of a github.com URL, or None for other hosts.
+    """
+    parsed = parse_github_url(url or "")
+    return parsed[:2] if parsed else None
+
+
+def _query(parsed: List[Tuple[str, str, Optional[str], Optional[str]]]) -> str:
+    fields = []
+    for i, (owner, repo, branch, subpath) in enumerate(parsed):
+        # The README is looked up on the branch and in the directory the URL points at
+        expression = json.dumps(f"{branch or 'HEAD'}:{subpath or ''}")
+        fields.append(f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) "
+                      f"{{{REPO_FIELDS % expression}}}")
+    return "query {\n" + "\n".join(fields) + "\n}"
+
+
+def _readme_path(obj: Optional[dict], subpath: Optional[str]) -> Optional[str]:
+    if not obj:
+        return None
+    if obj["__typename"] == "Blob":
+        # The URL points at a file, most likely the README itself
+        return subpath
+    names = [e["name"] for e in obj.get("entries") or [] if e["type"] == "blob" and e["name"].lower().startswith("readme")]
+    if not names:
+        return None
+    name = min(names, key=lambda n: (n.lower() != "readme.md", not n.lower().endswith(".md"), n))
+    return f"{subpath.strip('/')}/{name}" if subpath else name
+
+
+def _metadata(repo: dict, subpath: Optional[str]) -> dict:
+    language = ((repo.get("primaryLanguage") or {}).get("name") or "").lower() or None
+    pushed_at = repo.get("pushedAt")
+    return {
+        "stars": repo.get("stargazerCount"),
+        "language": LANGUAGE_ALIASES.get(language, language),
+        "default_branch": (repo.get("defaultBranchRef") or {}).get("name"),
+        "readme_path": _readme_path(repo.get("object"), subpath),
+        "archived": int(bool(repo.get("isArchived"))),
+        "pushed_at": int(datetime.fromisoformat(pushed_at.replace("Z", "+00:00")).timestamp()) if pushed_at else None,
+    }
+
+
+async def _fetch_batch(client: httpx.AsyncClient, urls: List[str], sem: asyncio.Semaphore) -> Dict[str, dict]:
+    parsed = [parse_github_url(url) for url in urls]
+    query = _query(parsed)
+    async with sem:
+        for attempt in range(RETRIES + 1):
+            resp = None
+            try:
+                resp = await client.post(f"{API_BASE}/graphql", json={"query": query}, headers=_api_headers())
+                if resp.status_code == 200:
+                    break
+                if resp.status_code not in RETRY_STATUSES:
+                    print(f"GraphQL metadata query failed: HTTP {resp.status_code}")
+                    return {}
+            except httpx.HTTPError as e:
+                print(f"GraphQL metadata query failed: {e}")
+            if attempt < RETRIES:
+                await asyncio.sleep(_backoff(attempt, resp))
+        else:
+            return {}
+
+    # Repos GraphQL doesn't find (NOT_FOUND) are left out rather than reported gone:
+    # a renamed repo only resolves through the redirect a plain GET follows
+    data = resp.json().get("data") or {}
+    results = {}
+    for i, (url, (_, _, _, subpath)) in enumerate(zip(urls, parsed)):
+        repo = data.get(f"r{i}")
+        if repo is not None:
+            results[url] = _metadata(repo, subpath)
+    return results
+
+
+async def fetch_metadata_async(urls: Iterable[str], batch_size: int = BATCH_SIZE,
+                               concurrency: int = CONCURRENCY) -> Dict[str, dict]:
+    urls = [url for url in dict.fromkeys(urls) if github_repo(url)]
+    sem = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(timeout=TIMEOUT, follow_redirects=True) as client:
+        batches = await asyncio.gather(*(_fetch_batch(client, urls[i:i + batch_size], sem)
+                                         for i in range(0, len(urls), batch_size)))
+    return {url: result for batch in batches for url, result in batch.items()}
+
+
+def fetch_metadata(urls: Iterable[str], **kwargs) -> Dict[str, dict]:
+    """
+    {url: metadata} for the GitHub URLs among `urls` whose repo was found. URLs whose
+    repo was not found or whose lookup failed are left out.
+    """
+    if not os.getenv("GITHUB_TOKEN"):
+        print("GITHUB_TOKEN not set, skipping repository metadata")
+        return {}
+    return asyncio.run(fetch_metadata_async(urls, **kwargs))
+
+
+def update_metadata(db_path: str, missing_only: bool = False, drop_archived: bool = False) -> int:
+    """
+    Store the metadata of the catalogue's GitHub repos (of those never enriched, with
+    `missing_only`). Found repos count as a successful link check; repos GraphQL does
+    not find are left to the link check of maintain_db. With `drop_archived`, servers
+    whose repo is archived are removed. Returns the number removed.
+    """
+    from scrape import connect_db
+
+    conn = connect_db(db_path)
+    where = " WHERE enriched_at IS NULL" if missing_only else ""
+    ids = dict(conn.execute(f"SELECT url, id FROM servers{where}"))
+    metadata = fetch_metadata(ids)
+    now = int(time.time())
+    archived = [(ids[url],) for url, m in metadata.items() if m["archived"]]
+    with conn:
+        conn.executemany('''
+            UPDATE servers SET stars = ?, language = COALESCE(language, ?), default_branch = ?, readme_path = ?,
+                archived = ?, pushed_at = ?, enriched_at = ?, validated_at = ?
+            WHERE id = ?
+        ''', [tuple(m[c] for c in COLUMNS) + (now, now, ids[url]) for url, m in metadata.items()])
+        if drop_archived:
+            conn.executemany("DELETE FROM servers WHERE id = ?", archived)
+    conn.close()
+    print(f"Enriched {len(metadata)} of {len(ids)} servers"
+          + (f", removed {len(archived)} archived repos" if drop_archived else ""))
+    return len(archived) if drop_archived else 0
+
+
+_readers = threading.local()
+
+
+def _reader(db_path: str) -> sqlite3.Connection:
+    """
+    Read-only connection to the catalogue, one per thread and kept open, since
+    readme_location runs on every fetch_readme call.
+    """
+    conns = _readers.__dict__.setdefault("conns", {})
+    if db_path not in conns:
+        conns[db_path] = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    return conns[db_path]
+
+
+def readme_location(db_path: str, url: str) -> Optional[Tuple[str, str]]:
+    """
+    (branch, path) of the README of the server at `url`, as found by update_metadata,
+    or None if the catalogue doesn't know it.
+    """
+    from scrape import normalize_url
+
+    parsed = parse_github_url(url)
+    try:
+        row = _reader(db_path).execute("SELECT default_branch, readme_path FROM servers WHERE url_key = ?",
+                                       (normalize_url(url),)).fetchone()
+    except sqlite3.Error:
+        # No catalogue, or one from before these columns
+        return None
+    if not row or not row[1] or parsed is None:
+        return None
+    branch = parsed[2] or row[0]
+    return (branch, row[1]) if branch else None
@@ -1,14 +1,21 @@
-import requests
+import asyncio
+import hashlib
+import itertools
+import json
 import re
 import os
+import shutil
 import sqlite3
-from typing import List
+import sys
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
 
+import httpx
 from dotenv import load_dotenv
 
-from langchain.schema import Document
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
+import index_store
+import readme_digest
 
 load_dotenv()
 GH_TOKEN = os.getenv("GITHUB_TOKEN")
@@ -24,7 +31,33 @@ HEADER = {
 }
 DB_PATH = 'db/server_list.db'
 TXT_PATH = 'db/mcp_servers.txt'
+# ETag / Last-Modified of every list at the last scrape
+SOURCE_STATE_PATH = 'db/sources_state.json'
+SOURCE_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
 INDEX_DIR = "db/faiss_index"
+# Texts sent to the embedding backend per call while building the index
+EMBED_CHUNK = 4096
+
+# Structured attributes of a server, filterable in quick_search (see attributes.py)
+ATTRIBUTE_COLUMNS = {
+    'sources': 'TEXT',            # comma-separated lists the server was scraped from
+    'official': 'INTEGER',        # 1 if listed as an official implementation
+    'docker': 'INTEGER',          # 1 if a Docker image is published (metorial/mcp-containers)
+    'language': 'TEXT',
+    'stars': 'INTEGER',
+    'requires_api_key': 'INTEGER',  # 1, 0 or NULL when unknown
+    'validated_at': 'INTEGER',    # unix time of the last successful link check
+}
+# Legend of punkpeye/awesome-mcp-servers, kept as {tag} markers in the scraped lines
+LEGEND = {
+    "\U0001F396\uFE0F": "official", "\U0001F40D": "python", "\U0001F4C7": "typescript",
+    "\U0001F3CE\uFE0F": "go", "\U0001F980": "rust", "#\uFE0F\u20E3": "csharp", "\u2615": "java",
+    "\U0001F30A": "c++", "\U0001F48E": "ruby",
+}
+LANGUAGES = {"python", "typescript", "go", "rust", "csharp", "java", "c++", "ruby"}
+LINE_RE = re.compile(r'- \[([^\]]+)\]\(([^)]+)\)((?:\s*\{[a-z+]+\})*)[\s#]*-\s*(.+)')
+NO_API_KEY_RE = re.compile(r"\b(?:no|without(?: an?)?)\s+api[-_ ]?keys?\b", re.IGNORECASE)
+API_KEY_RE = re.compile(r"\b(?:api[-_ ]?key|apikey|access token|credentials)\b", re.IGNORECASE)
 
 # Scraping functions
 
@@ -38,140 +71,569 @@ def clean_text(text: str) -> List[str]:
     return clean
 
 
-def get_source1():
-    repo_url = (
-        "https://raw.githubusercontent.com/punkpeye/awesome-mcp-servers/refs/heads/main/README.md"
-    )
-    response = requests.get(repo_url, headers=HEADER)
-    section = response.text.split("## Server Implementations", 1)[1]
+def tag_line(line: str, tags) -> str:
+    """
+    Insert {tag} markers right after the link of a "- [name](url) - description" line.
+    """
+    if not tags:
+        return line
+    marker = " " + " ".join("{%s}" % t for t in tags)
+    return re.sub(r'(\]\([^)]+\))', lambda m: m.group(1) + marker, line, count=1)
+
+
+def legend_tags(line: str) -> List[str]:
+    return [tag for emoji, tag in LEGEND.items() if emoji in line]
+
+
+def parse_source1(text: str) -> List[str]:
+    section = text.split("## Server Implementations", 1)[1]
     section = section.split("## Frameworks", 1)[0]
-    lines = [clean_text(ln) for ln in section.splitlines() if ln.startswith("- ")]
+    # The legend emojis carry the language and "official" flag, read them before cleaning
+    lines = [tag_line(clean_text(ln), legend_tags(ln)) for ln in section.splitlines() if ln.startswith("- ")]
     return lines
 
 
-def get_source2():
-    repo_url = "https://raw.githubusercontent.com/metorial/mcp-containers/refs/heads/main/README.md"
-    response = requests.get(repo_url, headers=HEADER)
-    text = response.text
+def parse_source2(text: str) -> List[str]:
     text = re.sub(r'<img[^>]*>', '', text)
     text = re.sub(r'\*\*', '', text)
     section = text.split("## Featured Servers", 1)[1]
     section = section.split("# License", 1)[0].replace("## Available Servers", '')
-    lines = [clean_text(ln) for ln in section.split("\n\n") if ln.strip().startswith("- ")]
+    # Every server in mcp-containers comes with a Docker image
+    lines = [tag_line(clean_text(ln), ["docker"]) for ln in section.split("\n\n") if ln.strip().startswith("- ")]
     return lines
 
 
-def get_source3():
-    repo_url = "https://raw.githubusercontent.com/wong2/awesome-mcp-servers/refs/heads/main/README.md"
-    response = requests.get(repo_url, headers=HEADER)
-    section = response.text.split("## Official Servers", 1)[1]
-    section = section.split("## Clients", 1)[0].replace("## Community Servers", '')
-    lines = [clean_text(ln) for ln in section.splitlines() if ln.strip().startswith("- ")]
+def parse_source3(text: str) -> List[str]:
+    section = text.split("## Official Servers", 1)[1]
+    section = section.split("## Clients", 1)[0]
+    official, _, community = section.partition("## Community Servers")
+    lines = [tag_line(clean_text(ln), ["official"]) for ln in official.splitlines() if ln.strip().startswith("- ")]
+    lines += [clean_text(ln) for ln in community.splitlines() if ln.strip().startswith("- ")]
+    return lines
+
+
+SOURCES = (
+    ("punkpeye", "https://raw.githubusercontent.com/punkpeye/awesome-mcp-servers/refs/heads/main/README.md",
+     parse_source1),
+    ("metorial", "https://raw.githubusercontent.com/metorial/mcp-containers/refs/heads/main/README.md",
+     parse_source2),
+    ("wong2", "https://raw.githubusercontent.com/wong2/awesome-mcp-servers/refs/heads/main/README.md",
+     parse_source3),
+)
+
+
+def read_snapshot(txt_path=TXT_PATH) -> Dict[str, List[str]]:
+    """
+    Lines of the previous scrape per source, from the text file written by get_all_sources.
+    """
+    snapshot, source = {}, None
+    if not os.path.exists(txt_path):
+        return snapshot
+    with open(txt_path, 'r', encoding='utf-8') as f:
+        for line in f.read().splitlines():
+            if line.startswith('# source:'):
+                source = line.split(':', 1)[1].strip()
+                snapshot[source] = []
+            elif source is not None:
+                snapshot[source].append(line)
+    return snapshot
+
+
+def _load_validators(path=SOURCE_STATE_PATH) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+async def _fetch_source(client, name: str, url: str, parse, validators: dict, previous: Optional[List[str]]):
+    """
+    (lines, changed, validators) of one list. Unchanged, unreachable or unparsable
+    lists keep their previous lines, so a failed fetch never looks like removals.
+    """
+    headers = dict(HEADER)
+    # Only ask for a 304 when there are lines to fall back on
+    if previous is not None:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    try:
+        resp = await client.get(url, headers=headers)
+        if resp.status_code == 304:
+            print(f"Source {name} unchanged")
+            return previous, False, validators
+        resp.raise_for_status()
+        lines = parse(resp.text)
+    except (httpx.HTTPError, IndexError) as e:
+        print(f"Source {name} failed ({e!r}), keeping the previous scrape")
+        return previous or [], False, validators
+    validators = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+    return lines, lines != previous, validators
+
+
+async def fetch_sources_async(snapshot: Dict[str, List[str]], state: dict):
+    async with httpx.AsyncClient(timeout=SOURCE_TIMEOUT, follow_redirects=True) as client:
+        results = await asyncio.gather(*(
+            _fetch_source(client, name, url, parse, state.get(name, {}), snapshot.get(name))
+            for name, url, parse in SOURCES
+        ))
+    return {name: result for (name, _, _), result in zip(SOURCES, results)}
+
+
+def fetch_sources(txt_path=TXT_PATH, state_path=SOURCE_STATE_PATH):
+    """
+    Fetch all lists concurrently with conditional requests against the previous
+    scrape. Returns ({source: lines}, names of the sources whose lines changed,
+    validators to `save_validators` once the lines are written to `txt_path`).
+    """
+    results = asyncio.run(fetch_sources_async(read_snapshot(txt_path), _load_validators(state_path)))
+    return ({name: lines for name, (lines, _, _) in results.items()},
+            [name for name, (_, changed, _) in results.items() if changed],
+            {name: validators for name, (_, _, validators) in results.items()})
+
+
+def save_validators(validators: dict, state_path=SOURCE_STATE_PATH):
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(validators, f, indent=2)
+
+
+def source_lines(lines_by_source: Dict[str, List[str]]) -> List[str]:
+    lines = []
+    for name, _, _ in SOURCES:
+        lines.append(f"# source: {name}")
+        lines += lines_by_source.get(name, [])
     return lines
 
 
 def get_all_sources():
-    s1 = get_source1()
-    s2 = get_source2()
-    s3 = get_source3()
-    return s1 + s2 + s3
+    """
+    Scraped lines of all lists, each list preceded by a "# source: <name>" line.
+    """
+    return source_lines(fetch_sources()[0])
+
+
+def changed_urls(old: Dict[str, List[str]], new: Dict[str, List[str]]) -> set:
+    """
+    Normalized urls of the entries added to or removed from any list.
+    """
+    keys = set()
+    for name in set(old) | set(new):
+        for line in set(old.get(name, [])) ^ set(new.get(name, [])):
+            match = LINE_RE.match(line.strip())
+            if match:
+                keys.add(normalize_url(match.group(2)))
+    return keys
+
 
 # Database functions
 
-def create_db_and_table(db_path):
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute('''
+def normalize_url(url: str) -> str:
+    """
+    Key under which different spellings of one link count as the same server: no
+    scheme, "www.", trailing slash or fragment, lowercase host and, on GitHub,
+    case-insensitive owner/repo without ".git".
+    """
+    parts = urlsplit((url or '').strip())
+    host = parts.netloc.lower()
+    host = host[4:] if host.startswith('www.') else host
+    path = parts.path.rstrip('/')
+    if host == 'github.com':
+        segments = path.split('/')
+        segments[1:3] = [seg.lower() for seg in segments[1:3]]
+        if len(segments) == 3 and segments[2].endswith('.git'):
+            segments[2] = segments[2][:-4]
+        path = '/'.join(segments)
+    return host + path + (f'?{parts.query}' if parts.query else '')
+
+
+# Schema migrations, applied in order; PRAGMA user_version counts those applied.
+# Append new ones, never change one that has shipped.
+def _migrate_columns(conn):
+    # Databases from before user_version may already have some of these columns
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS servers (
             name TEXT PRIMARY KEY,
             description TEXT,
             url TEXT
         )
     ''')
-    conn.commit()
-    conn.close()
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(servers)')}
+    for name, sql_type in [('embedded_hash', 'TEXT'), ('sources', 'TEXT'), ('official', 'INTEGER'),
+                           ('docker', 'INTEGER'), ('language', 'TEXT'), ('stars', 'INTEGER'),
+                           ('requires_api_key', 'INTEGER'), ('validated_at', 'INTEGER')]:
+        if name not in columns:
+            conn.execute(f'ALTER TABLE servers ADD COLUMN {name} {sql_type}')
+
+
+def _migrate_ids(conn):
+    # Integer ids and a unique normalized url, so lookups by url use an index.
+    # Of several rows with the same normalized url the oldest one is kept.
+    conn.create_function('normalize_url', 1, normalize_url, deterministic=True)
+    conn.execute('''
+        CREATE TABLE servers_new (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            description TEXT,
+            url TEXT NOT NULL,
+            url_key TEXT NOT NULL UNIQUE,
+            embedded_hash TEXT,
+            sources TEXT,
+            official INTEGER,
+            docker INTEGER,
+            language TEXT,
+            stars INTEGER,
+            requires_api_key INTEGER,
+            validated_at INTEGER
+        )
+    ''')
+    columns = ('name, description, url, embedded_hash, sources, official, docker, language, stars, '
+               'requires_api_key, validated_at')
+    conn.execute(f'''
+        INSERT OR IGNORE INTO servers_new (id, {columns}, url_key)
+        SELECT rowid, {columns}, normalize_url(url) FROM servers
+        WHERE name IS NOT NULL AND url IS NOT NULL ORDER BY rowid
+    ''')
+    dropped = conn.execute('SELECT (SELECT COUNT(*) FROM servers) - (SELECT COUNT(*) FROM servers_new)').fetchone()[0]
+    if dropped:
+        print(f"Dropped {dropped} servers with a duplicate url")
+    conn.execute('DROP TABLE servers')
+    conn.execute('ALTER TABLE servers_new RENAME TO servers')
+
+
+def _migrate_digests(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS readme_digests (
+            name TEXT PRIMARY KEY,
+            requires_api_key INTEGER,
+            env_vars TEXT,
+            install TEXT,
+            mcp_config TEXT,
+            summary TEXT,
+            readme_url TEXT,
+            updated_at INTEGER
+        )
+    ''')
+
+
+def _migrate_repo_metadata(conn):
+    # Filled in by repo_metadata.update_metadata
+    for name, sql_type in [('default_branch', 'TEXT'), ('readme_path', 'TEXT'), ('archived', 'INTEGER'),
+                           ('pushed_at', 'INTEGER'), ('enriched_at', 'INTEGER')]:
+        conn.execute(f'ALTER TABLE servers ADD COLUMN {name} {sql_type}')
+
+
+MIGRATIONS = [_migrate_columns, _migrate_ids, _migrate_digests, _migrate_repo_metadata]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """
+    Bring the schema up to SCHEMA_VERSION, one transaction per migration.
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            migration(conn)
+            conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def connect_db(db_path):
+    """
+    Connection for writing the catalogue, with the schema migrated. The database is
+    in WAL mode, so the server keeps reading it while scrape.py or maintain.py write.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    migrate(conn)
+    return conn
+
+
+def create_db_and_table(db_path):
+    connect_db(db_path).close()
+
+
+def requires_api_key(description: str):
+    """
+    1 or 0 if the description says whether an API key is needed, else None.
+    """
+    if NO_API_KEY_RE.search(description):
+        return 0
+    if API_KEY_RE.search(description):
+        return 1
+    return None
 
 
 def read_servers_from_txt(txt_path):
+    """
+    Returns (name, description, url, attributes) tuples; attributes holds the
+    scraped ATTRIBUTE_COLUMNS (sources, official, docker, language, requires_api_key).
+    """
     servers = []
     if not os.path.exists(txt_path):
         return servers
+    source = None
     with open(txt_path, 'r', encoding='utf-8') as f:
         for line in f:
             line = line.strip()
+            if line.startswith('# source:'):
+                source = line.split(':', 1)[1].strip()
+                continue
             if not line or line.startswith('#'):
                 continue
-            match = re.match(r'- \[([^\]]+)\]\(([^)]+)\)\s*-\s*(.+)', line)
+            match = LINE_RE.match(line)
             if not match:
                 continue
-            name, url, description = match.groups()
-            servers.append((name, description, url))
+            name, url, tags, description = match.groups()
+            tags = set(re.findall(r'\{([a-z+]+)\}', tags))
+            attributes = {
+                'sources': source,
+                'official': 1 if 'official' in tags else 0,
+                'docker': 1 if 'docker' in tags else 0,
+                'language': next((t for t in sorted(tags) if t in LANGUAGES), None),
+                'requires_api_key': requires_api_key(description),
+            }
+            servers.append((name, description.strip(), url, attributes))
     return servers
 
 
+def merge_attributes(a: dict, b: dict) -> dict:
+    """
+    Attributes of a server listed in several sources.
+    """
+    sources = [s for s in (a.get('sources') or '').split(',') + (b.get('sources') or '').split(',') if s]
+    return {
+        'sources': ','.join(dict.fromkeys(sources)) or None,
+        'official': max(a.get('official') or 0, b.get('official') or 0),
+        'docker': max(a.get('docker') or 0, b.get('docker') or 0),
+        'language': a.get('language') or b.get('language'),
+        'requires_api_key': a.get('requires_api_key') if a.get('requires_api_key') is not None
+        else b.get('requires_api_key'),
+    }
+
+
 def update_db(db_path, servers):
-    conn = sqlite3.connect(db_path)
+    """
+    Validate the links of servers not yet in the DB and insert the reachable ones.
+    Links are checked concurrently, one batch at a time, and each batch is written
+    as one transaction of bulk upserts keyed on the normalized url. The commit per
+    batch is deliberate: the write lock is never held across link checks, and a run
+    that dies midway keeps the batches it already validated.
+    """
+    import link_validator
+
+    conn = connect_db(db_path)
     c = conn.cursor()
-    for name, description, url in servers:
-        c.execute('SELECT 1 FROM servers WHERE url = ?', (url,))
-        if c.fetchone() is None:
-            try:
-                response = requests.get(url, headers=HEADER, timeout=10)
-                if response.status_code == 200:
-                    try:
-                        c.execute('''
-                            INSERT INTO servers (name, description, url)
-                            VALUES (?, ?, ?)
-                        ''', (name, description, url))
-                        print(f"Added: {name}, {url} to {DB_PATH}")
-                    except sqlite3.IntegrityError:
-                        print(f"Name conflict: {name}, {url}")
-                elif response.status_code == 404:
-                    # Remove without logging
-                    c.execute('DELETE FROM servers WHERE url = ?', (url,))
-                elif response.status_code == 403:
-                    print(f"Access denied for {url}: HTTP 403 Forbidden, Skipping as well. ")
-                else:
-                    print(f"Skipping {url}: HTTP {response.status_code}")
-            except Exception as e:
-                print(f"Error accessing {url}: {e}")
-    conn.commit()
-    conn.close()
+    known_urls = {key for (key,) in c.execute('SELECT url_key FROM servers')}
+    known_names = {name for (name,) in c.execute('SELECT name FROM servers')}
 
+    # Merge the attributes of servers listed in several sources (or under several spellings)
+    attributes = {}
+    for _, _, url, attrs in servers:
+        key = normalize_url(url)
+        attributes[key] = merge_attributes(attributes[key], attrs) if key in attributes else attrs
 
-def generate_embeddings(db_path):
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute('SELECT name, description, url FROM servers')
-    rows = c.fetchall()
+    # Scraped attributes of known servers may have changed (e.g. now in another list)
+    scraped = ('sources', 'official', 'docker', 'language', 'requires_api_key')
+    with conn:
+        c.executemany(
+            f"UPDATE servers SET {', '.join(f'{col} = ?' for col in scraped)} WHERE url_key = ?",
+            [tuple(attrs[col] for col in scraped) + (key,) for key, attrs in attributes.items() if key in known_urls],
+        )
+
+    new_servers = {}
+    for name, description, url, _ in servers:
+        key = normalize_url(url)
+        if key not in known_urls:
+            new_servers.setdefault(key, (name, description, url))
+    print(f"Validating {len(new_servers)} new server links")
+
+    for batch in link_validator.batched(list(new_servers.values())):
+        results = link_validator.check_urls(url for _, _, url in batch)
+        to_insert = []
+        to_delete = []
+        now = int(time.time())
+        for name, description, url in batch:
+            status, error = results[url]
+            key = normalize_url(url)
+            if status == 200:
+                if name in known_names:
+                    print(f"Name conflict: {name}, {url}")
+                    continue
+                known_names.add(name)
+                to_insert.append((name, description, url, key) + tuple(attributes[key][col] for col in scraped) + (now,))
+                print(f"Added: {name}, {url} to {DB_PATH}")
+            elif status == 404:
+                # Remove without logging
+                to_delete.append((key,))
+            elif status == 403:
+                print(f"Access denied for {url}: HTTP 403 Forbidden, Skipping as well. ")
+            elif status is None:
+                print(f"Error accessing {url}: {error}")
+            else:
+                print(f"Skipping {url}: HTTP {status}")
+        with conn:
+            c.executemany(f'''
+                INSERT INTO servers (name, description, url, url_key, {', '.join(scraped)}, validated_at)
+                VALUES ({', '.join('?' * (len(scraped) + 5))})
+                ON CONFLICT(url_key) DO UPDATE SET
+                    description = excluded.description,
+                    {', '.join(f'{col} = excluded.{col}' for col in scraped)},
+                    validated_at = excluded.validated_at
+            ''', to_insert)
+            c.executemany('DELETE FROM servers WHERE url_key = ?', to_delete)
     conn.close()
 
-    docs = [Document(page_content=desc, metadata={"name": name, "url": url}) for name, desc, url in rows]
-    embeddings = OpenAIEmbeddings()
-    vector_store = FAISS.from_documents(docs, embeddings)
-    vector_store.save_local(INDEX_DIR)
-    return vector_store
+
+def content_hash(name, description, url):
+    """
+    Fingerprint of everything that ends up in the vector index for one server.
+    """
+    return hashlib.sha256(f"{name}\0{description}\0{url}".encode("utf-8")).hexdigest()
+
+
+def generate_embeddings(db_path, index_dir=INDEX_DIR, full_rebuild=False):
+    """
+    Bring the vector index up to date with the servers table.
+
+    Rows are identified by servers.id, so a renamed server keeps its row. Only rows
+    that are new or whose content hash differs from `embedded_hash` are embedded;
+    vectors of unchanged rows are copied over from the live index and those of
+    removed rows are dropped. An index that doesn't store the ids is rebuilt. The result is
+    written as a new index version and published atomically (see index_store).
+    Returns the number of rows embedded, or None if the index was already up to date.
+    """
+    # Imported here so that server.py can import the constants above without
+    # paying for numpy and the embedding backend at startup
+    import numpy as np
+
+    import vector_index
+    from embeddings import get_embeddings, index_matches, write_index_stamp
+
+    conn = connect_db(db_path)
+    rows = conn.execute('SELECT id, name, description, url, embedded_hash FROM servers').fetchall()
+    wanted = {server_id: (name, desc, url, content_hash(name, desc, url), embedded)
+              for server_id, name, desc, url, embedded in rows}
+
+    embeddings = get_embeddings()
+    old = None
+    current = index_store.current_path(index_dir)
+    # Indexes in the old LangChain/pickle format can't be patched and are rebuilt
+    if not full_rebuild and current and vector_index.exists(current) and index_matches(current, embeddings):
+        old = vector_index.VectorIndex(current)
+        server_ids = old.server_ids()
+        if server_ids is None:
+            old.close()
+            old = None
+
+    if old is None:
+        kept, changed = [], list(wanted)
+    else:
+        old_ids = {server_id: i for i, server_id in enumerate(server_ids)}
+        kept = [n for n, (_, _, _, h, embedded) in wanted.items() if n in old_ids and h == embedded]
+        changed = [n for n in wanted if n not in old_ids or wanted[n][3] != wanted[n][4]]
+        removed = sum(1 for n in old_ids if n not in wanted)
+        # A different INDEX_TYPE only needs the vectors copied and the ANN index rebuilt
+        if not changed and not removed and vector_index.type_matches(current):
+            print("Index is up to date, nothing to embed")
+            old.close()
+            conn.close()
+            return None
+        # Copy unchanged rows in their old order, so reads from the old file stay sequential
+        kept.sort(key=old_ids.get)
+
+    def embedded():
+        # Embed in chunks, so memory stays flat however many rows changed
+        for start in range(0, len(changed), EMBED_CHUNK):
+            texts = [wanted[n][1] for n in changed[start:start + EMBED_CHUNK]]
+            yield np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+    blocks = vector_index.chunks(old.vectors, [old_ids[n] for n in kept]) if kept else iter(())
+    dim = old.dim if old is not None else 0
+    if changed:
+        fresh = embedded()
+        first = next(fresh)
+        dim = first.shape[1]
+        blocks = itertools.chain(blocks, [first], fresh)
+
+    version_dir = index_store.new_version_dir(index_dir)
+    try:
+        vector_index.write_index(
+            version_dir,
+            [(n, *wanted[n][:3]) for n in kept + changed],
+            dim,
+            blocks,
+        )
+    except BaseException:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+    write_index_stamp(version_dir, embeddings)
+    if old is not None:
+        old.close()
+    index_type = vector_index.build_ann(version_dir)
+    index_store.publish(index_dir, version_dir)
+    if old is None:
+        print(f"Rebuilt index from scratch: {len(changed)} embeddings ({index_type})")
+    else:
+        print(f"Updated index: {len(changed)} embedded, {removed} removed ({index_type})")
+
+    conn.executemany('UPDATE servers SET embedded_hash = ? WHERE id = ?',
+                     [(wanted[n][3], n) for n in changed])
+    conn.commit()
+    conn.close()
+    return len(changed)
 
 # Main workflow
 if __name__ == '__main__':
-    # 1. Scrape and write to text file
-    sources = get_all_sources()
-    with open(TXT_PATH, 'w', encoding='utf-8') as f:
-        f.write("\n".join(sources))
-    print(f"Scraped {len(sources)} server entries to {TXT_PATH}")
+    # --force: update the DB and digests even when no list changed
+    force = '--force' in sys.argv[1:]
+
+    # 1. Scrape the lists that changed and write all of them to the text file
+    previous = read_snapshot(TXT_PATH)
+    scraped, changed, validators = fetch_sources()
+    if changed or force:
+        with open(TXT_PATH, 'w', encoding='utf-8') as f:
+            f.write("\n".join(source_lines(scraped)))
+        # Only now, so a run that dies before this point fetches the lists again
+        save_validators(validators)
+        print(f"Scraped {sum(len(lines) for lines in scraped.values())} server entries to {TXT_PATH}, "
+              f"changed: {', '.join(changed) or 'none'}")
+
+        # 2. Initialize DB
+        create_db_and_table(DB_PATH)
+
+        # 3. Clean up unreachable entries for prev database --> Moved to maintain.py
 
-    # 2. Initialize DB
-    create_db_and_table(DB_PATH)
+        # 4. Read scraped entries and update DB; only servers on added or removed lines need it
+        servers = read_servers_from_txt(TXT_PATH)
+        if not force:
+            affected = changed_urls(previous, scraped)
+            servers = [server for server in servers if normalize_url(server[2]) in affected]
+            print(f"{len(affected)} servers added to or removed from a list")
+        if servers:
+            update_db(DB_PATH, servers)
+        else:
+            print(f"No new or changed servers in {TXT_PATH}")
 
-    # 3. Clean up unreachable entries for prev database --> Moved to maintain.py
+        # Default branch, README path, stars etc. of new servers, in GraphQL batches
+        import repo_metadata
+        repo_metadata.update_metadata(DB_PATH, missing_only=not force)
 
-    # 4. Read scraped entries and update DB
-    servers = read_servers_from_txt(TXT_PATH)
-    if servers:
-        update_db(DB_PATH, servers)
+        # 5. Precompute API-key flags, env vars, install commands and summaries from the READMEs
+        readme_digest.update_digests(DB_PATH)
     else:
-        print(f"No valid servers found in {TXT_PATH}")
+        # A 200 with the same lines still brings new validators; the text file already
+        # holds these lines, so they can be saved right away
+        save_validators(validators)
+        print("No list changed since the last scrape, skipping the DB update")
 
-    # 5. Generate and save embeddings
+    # 6. Generate and save embeddings (a no-op when the index is up to date)
     generate_embeddings(DB_PATH)
-    print("Finished scraping, DB update, and embedding generation.")
\ No newline at end of file
+    print("Finished scraping, DB update, and embedding generation.")
@@ -0,0 +1,494 @@
+"""
+Search index used by `quick_search`, loaded off the request path.
+
+Loading means constructing the embedding backend, mapping (or, if missing,
+rebuilding) the vector index, building the BM25 index and running a warm-up
+query. That can take seconds, so `start_background_load()` does it on a worker
+thread while the HTTP server is already accepting connections.
+Tools call `get_index()` and get None until the index is ready.
+
+Once running, a watcher thread polls the index version (the CURRENT pointer in
+db/faiss_index plus the mtime of server_list.db) and, when the scraper publishes
+something new, loads it on that thread and swaps it in. Requests hold a reference
+to the index they started with, so in-flight searches finish on the old one.
+"""
+import base64
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import index_store
+from attributes import AttributeIndex
+from lexical import BM25Index, fused_scores
+from metrics import stage
+from scrape import DB_PATH, INDEX_DIR, generate_embeddings
+
+
+class SearchIndex:
+    """
+    A loaded vector index plus the lexical and attribute indexes built from the same
+    catalogue. Filters are evaluated over lexical doc ids; `row_docs` maps vector
+    rows to doc ids (-1 for rows not in the catalogue any more).
+    """
+
+    def __init__(self, vectors, lexical_index: BM25Index, embeddings, version: Tuple = (),
+                 attributes: Optional[AttributeIndex] = None):
+        self.vectors = vectors
+        self.lexical_index = lexical_index
+        self.embeddings = embeddings
+        self.version = version
+        names = [entry["name"] for entry in lexical_index.entries]
+        self.attributes = attributes if attributes is not None else AttributeIndex(names, {})
+        doc_ids = self.attributes.doc_ids
+        self.row_docs = np.fromiter((doc_ids.get(name, -1) for name in vectors.names()), dtype=np.int64,
+                                    count=len(vectors))
+
+    def filter_mask(self, filters: Optional[dict]) -> Optional[np.ndarray]:
+        """
+        Doc id mask of the servers matching `filters`, None when unfiltered.
+        Raises ValueError for invalid filters.
+        """
+        with stage("filter"):
+            return self.attributes.mask(filters)
+
+    def _row_mask(self, mask: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        # Index -1 picks the appended False
+        return None if mask is None else np.append(mask, False)[self.row_docs]
+
+    def vector_search(self, query: str, top_k: int = 20, mask: Optional[np.ndarray] = None) -> List[dict]:
+        """
+        Perform a similarity search over the vector index.
+        Returns the top_k entries most similar to `query` (among those `mask` allows).
+        """
+        try:
+            with stage("embedding"):
+                vector = self.embeddings.embed_query(query)
+            with stage("vector_search"):
+                hits = self.vectors.search([vector], top_k, self._row_mask(mask))[0]
+                return self.vectors.entries([i for i, _ in hits])
+        except Exception as e:
+            print(f"Vector search failed for '{query}': {e}")
+            return []
+
+    def vector_search_batch(self, queries: List[str], top_k: int = 20,
+                            mask: Optional[np.ndarray] = None) -> List[List[dict]]:
+        """
+        Vector search for several queries: one batched embedding call and one
+        search over the stacked query matrix.
+        Returns one list of entries per query, best first.
+        """
+        try:
+            with stage("embedding"):
+                matrix = self.embeddings.embed_queries(queries)
+            with stage("vector_search"):
+                hits = self.vectors.search(matrix, top_k, self._row_mask(mask))
+                return [self.vectors.entries([i for i, _ in row]) for row in hits]
+        except Exception as e:
+            print(f"Batch vector search failed for {len(queries)} queries: {e}")
+            return [[] for _ in queries]
+
+    def _lexical(self, query: str, top_k: int, mask: Optional[np.ndarray] = None):
+        """
+        Returns (by_name, lexical ranking, exact-name matches) for `query`.
+        """
+        lexical_index = self.lexical_index
+        by_name = {}
+        lexical_ranking = []
+        for doc_id, _ in lexical_index.search(query, top_k, mask):
+            entry = lexical_index.entries[doc_id]
+            by_name[entry["name"]] = entry
+            lexical_ranking.append(entry["name"])
+
+        exact = []
+        for doc_id in lexical_index.exact_matches(query):
+            if mask is not None and not mask[doc_id]:
+                continue
+            entry = lexical_index.entries[doc_id]
+            by_name[entry["name"]] = entry
+            exact.append(entry["name"])
+        return by_name, lexical_ranking, exact
+
+    @staticmethod
+    def _fuse(by_name: dict, lexical_ranking: List[str], exact: List[str], vector_hits: List[dict]) -> List[Tuple[str, float]]:
+        """
+        (name, score) pairs, best first. Exact-name matches are pinned at the top with
+        score 1, followed by the fused lexical and vector ranking.
+        """
+        vector_ranking = []
+        for entry in vector_hits:
+            by_name.setdefault(entry["name"], entry)
+            vector_ranking.append(entry["name"])
+        ranked = [(name, 1.0) for name in exact]
+        ranked += [(name, score) for name, score in fused_scores([lexical_ranking, vector_ranking])
+                   if name not in exact]
+        return ranked
+
+    def ranked(self, query: str, top_k: int = 20, filters: Optional[dict] = None) -> List[Tuple[dict, float]]:
+        """
+        Combine BM25 and vector search with reciprocal rank fusion. Servers whose name
+        is exactly the query come first. Both searches only consider servers matching
+        `filters` (see attributes.FILTERS).
+        Returns (entry, score) pairs, best first; entries have name, description and
+        url, scores are in [0, 1].
+        """
+        mask = self.filter_mask(filters)
+        if mask is not None and not mask.any():
+            return []
+        with stage("lexical"):
+            by_name, lexical_ranking, exact = self._lexical(query, top_k, mask)
+        vector_hits = self.vector_search(query, top_k, mask)
+        with stage("fusion"):
+            ranked = self._fuse(by_name, lexical_ranking, exact, vector_hits)
+        return [(by_name[name], score) for name, score in ranked[:top_k]]
+
+    def search(self, query: str, top_k: int = 20, filters: Optional[dict] = None) -> List[dict]:
+        """
+        Entries of `ranked`, best first.
+        """
+        return [entry for entry, _ in self.ranked(query, top_k, filters)]
+
+    def batch_search(self, queries: List[str], top_k: int = 20, filters: Optional[dict] = None) -> List[dict]:
+        """
+        `search` for several queries at once. The queries are embedded together and
+        searched with a single vector index call. `filters`
+        apply to every query.
+
+        A server matching several queries is only listed under the query that ranks
+        it highest (the earliest query on ties), so every server appears once.
+        Returns [{"query": ..., "results": [...]}] in the order of `queries`.
+        """
+        mask = self.filter_mask(filters)
+        if mask is not None and not mask.any():
+            return [{"query": query, "results": []} for query in queries]
+        with stage("lexical"):
+            lexical = [self._lexical(query, top_k, mask) for query in queries]
+        vector_hits = self.vector_search_batch(queries, top_k, mask) if queries else []
+
+        rankings = []
+        with stage("fusion"):
+            for i, (by_name, lexical_ranking, exact) in enumerate(lexical):
+                ranked = self._fuse(by_name, lexical_ranking, exact, vector_hits[i])
+                rankings.append([name for name, _ in ranked[:top_k]])
+
+        # name -> (rank, query index) of its best placement
+        best = {}
+        for i, ranking in enumerate(rankings):
+            for rank, name in enumerate(ranking):
+                if name not in best or rank < best[name][0]:
+                    best[name] = (rank, i)
+        return [
+            {
+                "query": query,
+                "results": [lexical[i][0][name] for name in rankings[i] if best[name][1] == i],
+            }
+            for i, query in enumerate(queries)
+        ]
+
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def index_version(db_path: str = DB_PATH, index_dir: str = INDEX_DIR) -> Tuple:
+    """
+    Cheap fingerprint of the on-disk index and catalogue; changes whenever either is rewritten.
+    The catalogue is in WAL mode, so its writes land in the -wal file until a checkpoint.
+    """
+    return index_store.current_version(index_dir), _mtime(db_path), _mtime(db_path + "-wal")
+
+
+def ensure_index(db_path: str = DB_PATH, index_dir: str = INDEX_DIR) -> bool:
+    """
+    Build the vector index if it is missing, in the old format, built with another
+    model or of another INDEX_TYPE. Returns True if it had to be built.
+    """
+    import vector_index
+    from embeddings import get_embeddings, index_matches
+
+    current = index_store.current_path(index_dir)
+    if (current and vector_index.exists(current) and index_matches(current, get_embeddings())
+            and vector_index.type_matches(current)):
+        return False
+    generate_embeddings(db_path, index_dir)
+    return True
+
+
+def load_search_index(db_path: str = DB_PATH, index_dir: str = INDEX_DIR,
+                      embeddings=None, build_missing: bool = True) -> SearchIndex:
+    """
+    Load (or build) everything `quick_search` needs. Blocking.
+
+    Pass the `embeddings` of the index being replaced to keep its query cache warm.
+    """
+    import vector_index
+    from embeddings import CachedEmbeddings, get_embeddings, index_matches
+
+    version = index_version(db_path, index_dir)
+    if embeddings is None:
+        # Query embeddings are memoized, so repeated searches skip the embedding round trip
+        embeddings = CachedEmbeddings(get_embeddings())
+    current = index_store.current_path(index_dir)
+    usable = bool(current) and vector_index.exists(current) and index_matches(current, embeddings)
+    if not usable and not build_missing:
+        raise RuntimeError(f"No usable index in {index_dir}")
+    if not (usable and vector_index.type_matches(current)) and build_missing:
+        # Index is missing, in the old pickle format, built with another model or of
+        # another INDEX_TYPE, so we need to (re)build it
+        generate_embeddings(db_path, index_dir)
+        version = index_version(db_path, index_dir)
+        current = index_store.current_path(index_dir)
+    # Memory-mapped, so this is cheap however large the catalogue is
+    vectors = vector_index.VectorIndex(current)
+
+    # Lexical index for exact-name and keyword queries, fused with the vector results
+    lexical_index = BM25Index.from_db(db_path)
+    # Filterable attributes, aligned with the lexical doc ids
+    attributes = AttributeIndex.from_db(db_path, [entry["name"] for entry in lexical_index.entries])
+
+    # perform a similarity search to ensure we can query the vector index
+    res = vectors.entries([i for i, _ in vectors.search([embeddings.embed_query("weather")], 1)[0]])
+    print(f"Result: {res}.")
+    return SearchIndex(vectors, lexical_index, embeddings, version, attributes)
+
+
+# -----------------------------------------------------------------------------
+# Background loading
+# -----------------------------------------------------------------------------
+_index: Optional[SearchIndex] = None
+_load_error: Optional[str] = None
+_load_started: Optional[float] = None
+_load_seconds: Optional[float] = None
+_failed_at: Optional[float] = None
+_load_lock = threading.Lock()
+# A failed load (e.g. embedding API down) is retried on demand after this many seconds
+RETRY_AFTER = 30
+
+
+def _load():
+    global _index, _load_error, _load_seconds, _failed_at
+    try:
+        _index = load_search_index()
+        _load_seconds = time.time() - _load_started
+        _load_error = None
+        print(f"Search index ready after {_load_seconds:.1f}s")
+    except Exception as e:
+        _load_error = str(e)
+        _failed_at = time.time()
+        print(f"Failed to initialize vector store: {e}")
+
+
+def _should_start() -> bool:
+    global _load_started, _load_error
+    with _load_lock:
+        if _load_started is not None:
+            if _load_error is None or time.time() - _failed_at < RETRY_AFTER:
+                return False
+        _load_started = time.time()
+        _load_error = None
+        return True
+
+
+def start_background_load():
+    """
+    Start loading the index on a daemon thread. Safe to call more than once.
+    """
+    if _should_start():
+        threading.Thread(target=_load, name="search-index-loader", daemon=True).start()
+
+
+def load_now():
+    """
+    Load the index on the calling thread (the old, blocking startup behaviour).
+    """
+    if _should_start():
+        _load()
+
+
+def get_index() -> Optional[SearchIndex]:
+    """
+    The loaded index, or None while it is still warming up (or failed to load).
+    """
+    if _index is None:
+        start_background_load()
+    return _index
+
+
+def status() -> dict:
+    if _index is not None:
+        state = "ready"
+    elif _load_error is not None:
+        state = "error"
+    else:
+        state = "loading"
+    result = {"index": state}
+    if _index is not None:
+        result["version"] = list(_index.version)
+        result["reloads"] = _reloads
+    if _load_seconds is not None:
+        result["load_seconds"] = round(_load_seconds, 3)
+    elif _load_started is not None:
+        result["loading_for_seconds"] = round(time.time() - _load_started, 3)
+    if _load_error is not None:
+        result["error"] = _load_error
+    return result
+
+
+# -----------------------------------------------------------------------------
+# Hot reload
+# -----------------------------------------------------------------------------
+RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", 60))  # seconds, 0 disables the watcher
+_reload_lock = threading.Lock()
+_reloads = 0
+
+
+def reload_index(force: bool = False) -> bool:
+    """
+    Load the on-disk index if its version changed (or `force`) and swap it in.
+    Blocking: call it from a worker thread, never from the event loop.
+    Returns True if a new index was swapped in.
+    """
+    global _index, _reloads
+    with _reload_lock:
+        old = _index
+        if old is None:
+            # Still on the initial load; that one will pick up the latest version
+            return False
+        if not force and index_version() == old.version:
+            return False
+        new = load_search_index(embeddings=old.embeddings, build_missing=False)
+        # A single reference assignment, so readers see either the old or the new index
+        _index = new
+        _reloads += 1
+        print(f"Reloaded search index, version {new.version}")
+        return True
+
+
+def _watch():
+    while True:
+        time.sleep(RELOAD_INTERVAL)
+        try:
+            reload_index()
+        except Exception as e:
+            # Keep serving the old index; the next poll tries again
+            print(f"Index reload failed: {e}")
+
+
+def start_watcher():
+    if RELOAD_INTERVAL > 0:
+        threading.Thread(target=_watch, name="search-index-watcher", daemon=True).start()
+
+
+# -----------------------------------------------------------------------------
+# Paged results
+# -----------------------------------------------------------------------------
+# quick_search ranks up to MAX_RESULTS servers once and hands out pages of that
+# ranking. The cursor carries the search itself (query, min_score, filters) and the
+# offset, plus a token naming the ranking in this process's cache. Later pages
+# served by the same process skip the search; any other worker, or this one after
+# the ranking was evicted, runs the search again from the cursor.
+MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", 100))
+CURSOR_CACHE_SIZE = int(os.getenv("SEARCH_CURSOR_CACHE_SIZE", 1024))
+
+
+class CursorCache:
+    """
+    Bounded LRU of ranked result lists, keyed by an opaque random token.
+    """
+
+    def __init__(self, max_size: int = CURSOR_CACHE_SIZE):
+        self.max_size = max_size
+        self._rankings: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, ranking: list) -> str:
+        token = secrets.token_urlsafe(9)
+        with self._lock:
+            self._rankings[token] = ranking
+            while len(self._rankings) > self.max_size:
+                self._rankings.popitem(last=False)
+        return token
+
+    def get(self, token: Optional[str]) -> Optional[list]:
+        with self._lock:
+            ranking = self._rankings.get(token) if token else None
+            if ranking is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._rankings.move_to_end(token)
+            return ranking
+
+    def stats(self) -> dict:
+        return {"entries": len(self._rankings), "max_entries": self.max_size,
+                "hits": self.hits, "misses": self.misses}
+
+
+_cursors = CursorCache()
+
+
+def cursor_stats() -> dict:
+    return _cursors.stats()
+
+
+def _encode_cursor(state: dict) -> str:
+    data = json.dumps(state, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Optional[dict]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+    if not (isinstance(state, dict) and isinstance(state.get("q"), str)
+            and isinstance(state.get("o"), int) and state["o"] >= 0
+            and isinstance(state.get("m"), (int, float))
+            and isinstance(state.get("f"), (dict, type(None)))):
+        return None
+    return state
+
+
+def _rank(index: SearchIndex, query: str, min_score: float, filters: Optional[dict]) -> List[Tuple[dict, float]]:
+    return [(entry, score) for entry, score in index.ranked(query, MAX_RESULTS, filters) if score >= min_score]
+
+
+def search_page(index: SearchIndex, query: str, page_size: int, cursor: Optional[str] = None,
+                min_score: float = 0.0, filters: Optional[dict] = None) -> Tuple[List[Tuple[dict, float]], Optional[str]]:
+    """
+    One page of ranked (entry, score) pairs plus the cursor for the next page
+    (None on the last page). A cursor continues the search it came from, so
+    `query`, `min_score` and `filters` only apply to the first page. Cursors work
+    on any worker: one that doesn't have the ranking cached runs the search again.
+    Raises ValueError for a malformed cursor.
+    """
+    if cursor:
+        state = _decode_cursor(cursor)
+        if state is None:
+            raise ValueError("Invalid cursor, run the search again without one")
+        query, min_score, filters, offset = state["q"], state["m"], state["f"], state["o"]
+        token = state.get("t")
+        ranking = _cursors.get(token)
+        if ranking is None:
+            ranking = _rank(index, query, min_score, filters)
+            token = _cursors.add(ranking)
+    else:
+        ranking = _rank(index, query, min_score, filters)
+        token = _cursors.add(ranking) if len(ranking) > page_size else None
+        offset = 0
+
+    end = offset + page_size
+    next_cursor = None
+    if end < len(ranking):
+        next_cursor = _encode_cursor({"t": token, "q": query, "m": min_score, "f": filters, "o": end})
+    return ranking[offset:end], next_cursor
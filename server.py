@@ -1,27 +1,33 @@
 from pathlib import Path
 
 import asyncio
+import contextlib
+import itertools
 import json
 import os
-import re
-from typing import List, Literal, Any
+from typing import Dict, List, Literal, Any
 from typing import Tuple, Optional
 import os
 from pathlib import Path
 
 from fastmcp import FastMCP
-from fastapi.responses import FileResponse, PlainTextResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from starlette.requests import Request
-import requests
 from fastapi import HTTPException
 from fastmcp import FastMCP
-from github import Github
-# LangChain RAG imports
-from langchain.schema import Document
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
 
-from scrape import INDEX_DIR, DB_PATH, HEADER
+import attributes
+import metrics
+import readme_digest
+import readme_fetcher
+import readme_sections
+import repo_metadata
+from singleflight import SingleFlight
+import search_index
+import static_assets
+import tool_executor
+from metrics import stage
+from scrape import DB_PATH
 
 DOCS_DIR = Path(__file__).parent / "docs"
 
@@ -35,123 +41,195 @@ if not os.environ.get("OPENAI_API_KEY"):
     except Exception as e:
         print(f"Failed to load .env file: {e}, no way to get an OPENAI_API_KEY")
 
-token = os.getenv("GITHUB_TOKEN", None)
-gh = Github(token) if token else Github()
 # -----------------------------------------------------------------------------
 # 1. Global constants and vars
 # -----------------------------------------------------------------------------
-entries: List[dict] = []
-vector_store: FAISS
+WARMING_UP_DETAIL = "The search index is still warming up, please retry in a few seconds."
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", 20))
+MAX_PAGE_SIZE = 100
+# Smallest fetch_readme chunk, so a tiny max_chars can't turn a README into thousands of calls
+MIN_README_CHUNK = 1000
+# Fraction of landing-page asset requests that get logged
+STATIC_LOG_SAMPLE_RATE = float(os.getenv("STATIC_LOG_SAMPLE_RATE", 0.01))
+DEFAULT_FIELDS = ["name", "description", "url"]
+quick_search_flight = SingleFlight("quick_search")
 
 # -----------------------------------------------------------------------------
 # 2. Create/Load Faiss db
 # -----------------------------------------------------------------------------
-# @on_event("startup")
-# Load FAISS index with metadata
-embeddings = OpenAIEmbeddings()
-if os.path.isdir(INDEX_DIR):
-    vector_store = FAISS.load_local(
-        INDEX_DIR,
-        embeddings,
-        allow_dangerous_deserialization=True
-    )
-
-else:  # Vector Database is empty, so we need to build the index
-    import sqlite3
-
-    # Load all rows from SQLite once
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT name, description, url FROM servers")
-    rows = cursor.fetchall()
-    conn.close()
-    # Build in-memory list and corresponding Documents with metadata
-    docs = []
-    for name, description, url in rows:
-        entries.append({"name": name, "description": description, "url": url})
-        docs.append(Document(
-            page_content=description,
-            metadata={"name": name, "url": url}
-        ))
-    vector_store = FAISS.from_documents(docs, embeddings)
-    vector_store.save_local(INDEX_DIR)
-
-# perform a similarity search to ensure we can query the vector store
-try:
-    res = vector_store.similarity_search("weather", k=1)
-    print(f"Result: {res}.")
-except Exception as e:
-    raise HTTPException(status_code=500, detail=f"Failed to initialize vector store: {e}")
+# The vector index, embeddings and BM25 index are loaded by search_index, on a
+# background thread started from __main__ (or by the first quick_search call).
+# See search_index.load_search_index.
 
 # -----------------------------------------------------------------------------
 # 3. Initialize FastMCP, register tool
 # -----------------------------------------------------------------------------
 mcp = FastMCP("MCP Server Discovery")
 
-# compiling the api key pattern for fetch_readme.md only once here:
-API_KEY_PATTERN_RE = re.compile(
-    r"\b(?:api[-_ ]?key|apikey|x[-_]api[-_]key)\b",
-    re.IGNORECASE
-)
+
+# -----------------------------------------------------------------------------
+# HEALTH AND STATS (registered before the landing page catch-all route)
+# -----------------------------------------------------------------------------
+
+@mcp.custom_route("/health", methods=["GET"])
+async def serve_health(_: Request):
+    # Liveness: the process is up, whether or not the index has loaded yet
+    return JSONResponse({"status": "ok", **search_index.status()})
+
+
+@mcp.custom_route("/ready", methods=["GET"])
+async def serve_ready(_: Request):
+    # Readiness: 503 until quick_search can be served
+    status = search_index.status()
+    return JSONResponse(status, status_code=200 if status["index"] == "ready" else 503)
+
+
+@mcp.custom_route("/admin/reload", methods=["POST"])
+async def serve_reload(request: Request):
+    # Disabled unless ADMIN_TOKEN is set
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or request.headers.get("Authorization") != f"Bearer {admin_token}":
+        return PlainTextResponse("Not Found", status_code=404)
+    try:
+        # Loading takes seconds, keep it off the event loop
+        reloaded = await asyncio.to_thread(search_index.reload_index, True)
+    except Exception as e:
+        return JSONResponse({"reloaded": False, "error": str(e)}, status_code=500)
+    return JSONResponse({"reloaded": reloaded, **search_index.status()})
+
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def serve_stats(_: Request):
+    stats = {
+        "readme_cache": readme_fetcher.get_cache().stats(),
+    }
+    stats["tools"] = tool_executor.stats()
+    index = search_index.get_index()
+    if index is not None:
+        stats["query_embedding_cache"] = index.embeddings.stats()
+    stats["search_cursors"] = search_index.cursor_stats()
+    stats["static_assets"] = _landing_assets().stats()
+    stats["coalescing"] = {"readme": readme_fetcher.flight.stats(), "quick_search": quick_search_flight.stats()}
+    return JSONResponse(stats)
+
+
+def _cache_requests():
+    readme = readme_fetcher.get_cache().stats()
+    yield ("readme", "hit"), readme["hits"]
+    yield ("readme", "miss"), readme["misses"]
+    yield ("readme", "revalidation"), readme["revalidations"]
+    index = search_index.get_index()
+    if index is not None:
+        queries = index.embeddings.stats()
+        yield ("query_embedding", "hit"), queries["hits"]
+        yield ("query_embedding", "miss"), queries["misses"]
+
+
+def _cache_entries():
+    yield ("readme",), readme_fetcher.get_cache().stats()["entries"]
+    index = search_index.get_index()
+    if index is not None:
+        yield ("query_embedding",), index.embeddings.stats()["entries"]
+    yield ("search_cursor",), search_index.cursor_stats()["entries"]
+
+
+def _index_size():
+    index = search_index.get_index()
+    if index is not None:
+        yield ("vectors",), len(index.vectors)
+        yield ("vector_bytes",), index.vectors.vectors.nbytes
+        yield ("lexical_docs",), len(index.lexical_index)
+
+
+metrics.Callback("mcp_cache_requests_total", "Cache lookups by cache and result", ("cache", "result"),
+                 _cache_requests, kind="counter")
+metrics.Callback("mcp_cache_entries", "Entries held per cache", ("cache",), _cache_entries)
+metrics.Callback("mcp_index_size", "Size of the loaded search index", ("measure",), _index_size)
+metrics.Callback("mcp_index_ready", "1 once the search index is loaded", (),
+                 lambda: [((), int(search_index.status()["index"] == "ready"))])
+metrics.Callback("mcp_index_reloads_total", "Hot reloads of the search index", (),
+                 lambda: [((), search_index.status().get("reloads", 0))], kind="counter")
+STATIC_REQUESTS = metrics.Counter("mcp_static_requests_total", "Landing page asset requests", ("status",))
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def serve_metrics(_: Request):
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# -----------------------------------------------------------------------------
+# README STREAMING
+# -----------------------------------------------------------------------------
+
+@mcp.custom_route("/readme", methods=["GET"])
+async def serve_readme(request: Request):
+    """
+    Stream a README as NDJSON, one line per Markdown section, so clients can start
+    on the first sections right away and hang up once they have what they need.
+    ?url=<github url>[&section=Installation&section=Configuration ...]
+    The first line is {"status", "url", "require_api_key", "toc"}, then one
+    {"title", "level", "content"} line per section.
+    """
+    github_url = request.query_params.get("url")
+    if not github_url:
+        return JSONResponse({"status": "error: missing url parameter"}, status_code=400)
+    names = [n for value in request.query_params.getlist("section") for n in value.split(",")]
+    async with tool_executor.limit("fetch_readme"):
+        try:
+            found, status = await _find_readme(github_url)
+        except Exception as e:
+            return JSONResponse({"status": f"error: {e}"}, status_code=502)
+    if found is None:
+        return JSONResponse({"status": status}, status_code=404)
+
+    sections = readme_sections.split_sections(found.content)
+    selected = readme_sections.select(sections, names)
+
+    async def lines():
+        yield json.dumps({
+            "status": "success",
+            "url": found.url,
+            "require_api_key": bool(readme_digest.API_KEY_PATTERN_RE.search(found.content)),
+            "toc": readme_sections.toc(sections),
+        }) + "\n"
+        for section in selected:
+            yield json.dumps({"title": section.title, "level": section.level, "content": section.text}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 
 # -----------------------------------------------------------------------------
 # LANDING PAGE
 # -----------------------------------------------------------------------------
 
-def _file_or_404(p: Path):
-    if p.is_file():
-        # Add a tiny bit of caching for static assets
-        headers = {}
-        if any(part == "_next" for part in p.parts):
-            headers["Cache-Control"] = "public, max-age=31536000, immutable"
-        return FileResponse(p, headers=headers)
-    return PlainTextResponse("Not Found", status_code=404)
+def _landing_assets() -> static_assets.StaticAssets:
+    # docs/ is read into memory once, so assets are served without disk I/O
+    return static_assets.get_assets(DOCS_DIR)
 
 
 @mcp.custom_route("/", methods=["GET"])
-async def serve_root(_: Request):
-    return _file_or_404(DOCS_DIR / "index.html")
+async def serve_root(request: Request):
+    return _landing_assets().response("index.html", request.headers)
 
 @mcp.custom_route("/_next/{rest:path}", methods=["GET"])
 async def serve_next(request: Request):
-    if request is not None:
-        req = request.base_url
-        print(f"Got _next request: {req} requesting for url {request.url}")
     rest = request.path_params.get("rest", "")
-    print(request.path_params)
-    print(f"Serving _next file: {rest}")
-    return _file_or_404(DOCS_DIR / f"_next/{rest}")
+    resp = _landing_assets().response(f"_next/{rest}", request.headers)
+    STATIC_REQUESTS.inc(status=resp.status_code)
+    metrics.log_sampled("static_asset", STATIC_LOG_SAMPLE_RATE, path=request.url.path, status=resp.status_code)
+    return resp
 
 
 # Serve any other file that lives under docs/ (images, css, js, favicon, etc.)
 # e.g. /assets/logo.png, /robots.txt, /sitemap.xml, /favicon.ico
 @mcp.custom_route("/{rest:path}", methods=["GET"])
 async def serve_any(request: Request):
-    # Try exact file first
     rest = request.path_params.get("rest", "")
-    file_resp = _file_or_404(DOCS_DIR / rest)
-    if file_resp.status_code == 200:
-        return file_resp
-    # Optional SPA-style fallback: if you want unknown paths to render index.html
-    # (useful if you have client-side routing)
-    # return _file_or_404(_safe_path("index.html"))
-    return file_resp
+    return _landing_assets().response(rest, request.headers)
 # -----------------------------------------------------------------------------
 # END OF LANDING PAGE
 # -----------------------------------------------------------------------------
 
-def vector_store_search(query: str, top_k: int = 20) -> List[Document]:
-    """
-    Perform a similarity search over the vector store.
-    Returns the top_k entries most similar to `query`.
-    """
-    try:
-        matches = vector_store.similarity_search(query, k=top_k)
-        return matches
-    except Exception as e:
-        return []
-
-
 @mcp.tool()
 def deep_search_planning():
     """
@@ -167,7 +245,7 @@ def deep_search_planning():
 
 2. **Find MCP Servers**  
    For each component:  
-   a. Use the `quick_search` tool to locate the best-matching MCP server.  
+   a. Use the `quick_search` tool to locate the best-matching MCP server. With several components, call `batch_search` once with one query per component instead.  
    b. If a server’s functionality does not match exactly, inform the user and ask whether to:  
       - Ignore this component  
       - Break it down further  
@@ -176,7 +254,8 @@ def deep_search_planning():
 3. **Configure Servers**  
    For each MCP server:  
    a. **Fetch Documentation**  
-      - Call the `fetch_readme` tool to retrieve its README. REMEMBER to ask the user to configure credentials if the readme requires an API key.  
+      - Call the `server_details` tool (once, with all chosen servers) for API-key requirements, env vars and install commands. REMEMBER to ask the user to configure credentials if an API key is required.  
+      - Only call `fetch_readme` when you need more than those details.  
    b. **Configure Credentials**  
       - Scan the README for API-key or credential requirements.  
       - If there is an API KEY, Immediately provide the user with instructions to obtain any missing keys.  
@@ -228,7 +307,7 @@ def find_mcp_config_path(application: Literal['Cursor', 'Claude'], os: Literal["
 
 
 @mcp.tool(name="validate_mcp_config_content")
-def validate_mcp_config(mcp_config_content: str) -> bool:
+async def validate_mcp_config(mcp_config_content: str) -> bool:
     """
     Validate the MCP config content.
     The content must be a JSON object with a top-level `mcpServers` key,
@@ -236,6 +315,10 @@ def validate_mcp_config(mcp_config_content: str) -> bool:
 
     Returns True if the content meets the minimal schema, False otherwise.
     """
+    return await tool_executor.run("validate_mcp_config", _validate_mcp_config, mcp_config_content)
+
+
+def _validate_mcp_config(mcp_config_content: str) -> bool:
     try:
         obj = json.loads(mcp_config_content)
     except json.JSONDecodeError:
@@ -298,68 +381,143 @@ def validate_mcp_config(mcp_config_content: str) -> bool:
 
 
 @mcp.tool()
-def quick_search(query: str,
-                 top_k: int = 100) -> list[str]:
+async def quick_search(query: str,
+                       top_k: int = 10,
+                       cursor: Optional[str] = None,
+                       min_score: float = 0.0,
+                       fields: Optional[List[Literal[
+                           "name", "description", "url", "score", "sources", "official", "docker",
+                           "language", "stars", "requires_api_key", "validated_at"]]] = None,
+                       filters: Optional[Dict[str, Any]] = None) -> str:
     """
     This tool is for queries with explicit description of MCP functionality.
-    Given a free-text MCP description query, return the top_k matching MCP servers text descriptions
-    
+    Given a free-text MCP description query, return the best matching MCP servers, one page at a time.
+    Use `filters` rather than fetching many results and filtering them yourself.
+
     Args:
         query (str): A free-text query describing the desired MCP server.
+        top_k (int): Page size.
+        cursor (str): `next_cursor` from a previous call, to get the next page of the same search.
+        min_score (float): Drop results scoring below this, between 0 and 1.
+        fields (list[str]): Fields to return per server, default name, description and url.
+        filters (dict): Only return servers matching all of these, e.g.
+            {"official": true, "requires_api_key": false, "language": "python", "min_stars": 100}.
+            Keys: source, official, docker, language, min_stars, requires_api_key, validated_within_days.
     Returns:
-        list[str]: A list of dictionaries, each containing:
+        str: JSON object with "results", a list of dictionaries with the requested fields,
+        and "next_cursor", present only when there are more results.
     """
+    # Identical searches in flight at the same time share one run (and one tool slot)
+    key = (" ".join(query.split()), top_k, cursor, min_score, tuple(fields or ()),
+           json.dumps(filters, sort_keys=True, default=str))
+    return await quick_search_flight.do(key, tool_executor.run, "quick_search", _quick_search,
+                                        query, top_k, cursor, min_score, fields, filters)
+
 
-    matches = vector_store_search(query, top_k)
-    if not matches:
+def _quick_search(query: str, top_k: int, cursor: Optional[str], min_score: float,
+                  fields: Optional[List[str]], filters: Optional[Dict[str, Any]] = None) -> str:
+    if not 1 <= top_k <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"top_k must be between 1 and {MAX_PAGE_SIZE}")
+
+    index = search_index.get_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail=WARMING_UP_DETAIL)
+
+    try:
+        page, next_cursor = search_index.search_page(index, query, top_k, cursor, min_score, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not page:
         raise HTTPException(status_code=404, detail="No results found")
 
-    results = []
-    for doc in matches:
-        md = doc.metadata or {}
-        results.append({
-            "name": md.get("name", ""),
-            "description": doc.page_content,
-            "url": md.get("url", "")
-        })
+    with stage("serialization"):
+        fields = fields or DEFAULT_FIELDS
+        results = []
+        for entry, score in page:
+            row = {field: entry[field] for field in fields if field in entry}
+            if "score" in fields:
+                row["score"] = round(score, 4)
+            if any(field in attributes.ATTRIBUTE_FIELDS for field in fields):
+                described = index.attributes.describe(entry["name"])
+                row.update((field, described.get(field)) for field in fields if field in attributes.ATTRIBUTE_FIELDS)
+            results.append(row)
+        response = {"results": results}
+        if next_cursor:
+            response["next_cursor"] = next_cursor
+        return json.dumps(response)
+
+
+@mcp.tool()
+async def batch_search(queries: list[str],
+                       top_k: int = 20,
+                       filters: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Search for several MCP server descriptions in one call, e.g. one query per component
+    of a decomposed goal. Much faster than calling `quick_search` once per query.
+    A server matching several queries is only listed under the query it matches best.
+
+    Args:
+        queries (list[str]): Free-text queries, each describing one desired MCP server.
+        top_k (int): Maximum number of results per query.
+        filters (dict): Only return servers matching all of these, applied to every query
+            (same keys as in `quick_search`).
+    Returns:
+        str: JSON list with one {"query": ..., "results": [...]} entry per query, in order.
+        Blank queries get an empty "results".
+    """
+    return await tool_executor.run("batch_search", _batch_search, queries, top_k, filters)
+
+
+def _batch_search(queries: List[str], top_k: int, filters: Optional[Dict[str, Any]] = None) -> str:
+    # Blank queries keep their position, with no results, so replies line up with the request
+    searched = [i for i, q in enumerate(queries) if q.strip()]
+    if not searched:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+
+    index = search_index.get_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail=WARMING_UP_DETAIL)
 
-    return results
+    try:
+        found = index.batch_search([queries[i] for i in searched], top_k, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results = [{"query": query, "results": []} for query in queries]
+    for i, result in zip(searched, found):
+        results[i] = result
+    with stage("serialization"):
+        return json.dumps(results)
 
 
-def _parse_github_url(url: str) -> Optional[Tuple[str, str, Optional[str], Optional[str]]]:
+@mcp.tool()
+async def server_details(servers: list[str]) -> str:
     """
-    Parse a GitHub URL to extract owner, repo, branch (if present), and subpath.
-    Examples it understands:
-     - https://github.com/owner/repo
-     - https://github.com/owner/repo/
-     - https://github.com/owner/repo/tree/main/path/to/dir
-     - https://github.com/owner/repo/blob/main/path/to/README.md
-    Returns (owner, repo, branch, subpath) where branch/subpath may be None.
+    Setup facts for MCP servers found with `quick_search`, precomputed from their READMEs:
+    whether an API key is required, the environment variables to set, install commands,
+    an example mcpServers config and a short summary. Much cheaper than `fetch_readme`;
+    only fetch the full README when these are not enough.
+
+    Args:
+        servers (list[str]): Server names or URLs, as returned by `quick_search`.
+    Returns:
+        str: JSON object mapping each known server to its details. Servers whose README
+        has not been processed yet only have name, url and description.
     """
-    if "github.com/" not in url:
-        return None
-    # Remove protocol
-    path = url.split("github.com/", 1)[1]
-    path = path.strip().rstrip("/")
-    if path.endswith(".git"):
-        path = path[:-4]
-    parts = path.split("/")
-
-    if len(parts) < 2:
-        return None
-    owner, repo = parts[0], parts[1]
-    branch = None
-    subpath = None
-    if len(parts) >= 3:
-        kind = parts[2]  # e.g., "tree" or "blob" or something else
-        if kind in ("tree", "blob") and len(parts) >= 4:
-            branch = parts[3]
-            if len(parts) >= 5:
-                subpath = "/".join(parts[4:])
-        else:
-            # Could be direct owner/repo/<something>; treat that as subpath on default branch
-            subpath = "/".join(parts[2:])
-    return owner, repo, branch, subpath
+    return await tool_executor.run("server_details", _server_details, servers)
+
+
+def _server_details(servers: List[str]) -> str:
+    servers = list(dict.fromkeys(s.strip() for s in servers if s.strip()))
+    if not servers:
+        raise HTTPException(status_code=400, detail="No servers given")
+    if len(servers) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} servers per call")
+    with stage("lookup"):
+        details = readme_digest.lookup(DB_PATH, servers)
+    with stage("serialization"):
+        return json.dumps(details)
 
 
 @mcp.tool()
@@ -393,125 +551,115 @@ def file_system_config_setup():
 
 
 @mcp.tool(name="fetch_readme")
-def fetch_readme(github_url: str) -> str:
+async def fetch_readme(github_url: str,
+                       sections: Optional[List[str]] = None,
+                       max_chars: Optional[int] = None,
+                       cursor: Optional[str] = None) -> str:
     """
     Fetch the README content for a GitHub URL. If the URL is not for GitHub, returns empty content.
+    Prefer `server_details`, which answers the usual setup questions without the full README.
     Attempts to locate the README.md in the indicated directory (e.g., for
     https://github.com/owner/repo/tree/main/path, it fetches README.md inside path).
-    First tries raw.githubusercontent.com; if that fails, falls back to PyGithub API.
+    First tries raw.githubusercontent.com; if that fails, falls back to the GitHub API.
+
+    Large READMEs (e.g. monorepos) are better read in parts: pass `sections` to get only
+    the sections you need, and/or `max_chars` to get section-aligned chunks, and stop
+    once you have what you need.
+
+    Args:
+        github_url (str): GitHub URL of the server.
+        sections (list[str]): Only return sections whose heading matches one of these,
+            with their subsections, e.g. ["Installation", "Configuration", "Environment"].
+        max_chars (int): Return at most about this many characters, cut at section boundaries.
+        cursor (str): `next_cursor` of a previous call with the same other arguments.
 
     Returns JSON string with keys:
       - status: "success" or "error: <message>"
       - require_api_key: bool (heuristic scan)
       - content: README text (empty on error)
       - REMINDER: only present when require_api_key is True
+      - toc, sections: headings of the whole README and of the returned content (only
+        with sections, max_chars or cursor)
+      - next_cursor: present when there is more content to fetch
     """
-    import os
-    import json
-    import requests
+    async with tool_executor.limit("fetch_readme"):
+        return await _fetch_readme(github_url, sections, max_chars, cursor)
 
-    try:
-        parsed = _parse_github_url(github_url)
-        if parsed is None:
-            # Not parseable as GitHub URL: return empty content per spec
-            result = {
-                "status": "error: no support for non github urls for now. ",
-                "require_api_key": False,
-                "content": ""
-            }
-            return json.dumps(result)
 
-        owner, repo_name, branch, subpath = parsed
+async def _find_readme(github_url: str) -> Tuple[Optional[readme_fetcher.Readme], str]:
+    """
+    Returns (README, "success") or (None, "error: <message>").
+    """
+    parsed = readme_fetcher.parse_github_url(github_url)
+    if parsed is None:
+        return None, "error: no support for non github urls for now. "
 
-        # Attempt fetching raw README via raw.githubusercontent.com
-        # Determine branch: if not in URL, we may need to query API for default branch
-        use_branch = branch
-        if subpath:
-            # Directory: look for README.md inside that dir
-            # Avoid naive strip; ensure path ends without trailing slash
-            normalized_subpath = subpath.rstrip("/").lstrip("/")
-            readme_path_fragment = f"{normalized_subpath}/README.md"
-        else:
-            # Root: README.md at root
-            readme_path_fragment = "README.md"
+    owner, repo_name, branch, subpath = parsed
 
-        raw_content = None
+    # Served from the README cache when possible; otherwise fetched from where the
+    # catalogue says it is or, failing that, branch candidates are raced over the
+    # shared client and the API is only consulted when none has it.
+    location = await asyncio.to_thread(repo_metadata.readme_location, DB_PATH, github_url)
+    found = await readme_fetcher.get_readme(owner, repo_name, branch, subpath, location)
+    if found is None:
+        return None, f"error: could not locate README in '{github_url}' (tried raw fetch and API)"
+    return found, "success"
 
-        # If branch unknown, try common defaults first before hitting API
-        candidate_branches = []
-        if use_branch:
-            candidate_branches.append(use_branch)
-        else:
-            candidate_branches.extend(["main", "master"])
 
-        # We'll only query PyGithub for default branch if raw attempts fail and PyGithub is available
-        for br in candidate_branches:
-            raw_url = f"https://raw.githubusercontent.com/{owner}/{repo_name}/{br}/{readme_path_fragment}"
-            try:
-                resp = requests.get(raw_url, headers=HEADER, timeout=10)
-                if resp.status_code == 200:
-                    raw_content = resp.text
-                    use_branch = br
-                    break
-            except Exception:
-                # swallow and continue
-                pass
-
-        # If still no content, try to get default branch via API and fetch raw README there
-        if raw_content is None:
-            print(f"Fetching README from GitHub API for {owner}/{repo_name} on branch {use_branch}")
-            try:
-                from github import Github
-                token = os.getenv("GITHUB_TOKEN", None)
-                gh = Github(token) if token else Github()
-                repo = gh.get_repo(f"{owner}/{repo_name}")
-                if not use_branch:
-                    use_branch = getattr(repo, "default_branch", None)
-                if use_branch:
-                    raw_url = f"https://raw.githubusercontent.com/{owner}/{repo_name}/{use_branch}/{readme_path_fragment}"
-                    resp = requests.get(raw_url, headers=HEADER, timeout=10)
-                    if resp.status_code == 200:
-                        raw_content = resp.text
-                # Fallback: use GitHub API to get the README for that directory
-                if raw_content is None:
-                    target_dir = subpath or ""
-                    candidate_readme_path = (
-                        target_dir if target_dir.lower().endswith("readme.md") else f"{target_dir}/README.md"
-                    ).lstrip("/")
-                    try:
-                        content_file = repo.get_contents(candidate_readme_path, ref=use_branch)
-                        if content_file and getattr(content_file, "decoded_content", None):
-                            raw_content = content_file.decoded_content.decode()
-                    except Exception:
-                        # Last resort: root README
-                        try:
-                            root_readme = repo.get_readme(ref=use_branch)
-                            raw_content = root_readme.decoded_content.decode()
-                        except Exception:
-                            pass
-            except ImportError:
-                # PyGithub not installed; already tried raw.githubusercontent.com
-                pass
-            except Exception:
-                # swallow to allow downstream error handling
-                pass
-
-        if raw_content is None:
+def _readme_chunk(content: str, sections: Optional[List[str]], max_chars: Optional[int],
+                  cursor: Optional[str]) -> dict:
+    """
+    The part of `content` selected by `sections`, one `max_chars` chunk at a time.
+    """
+    all_sections = readme_sections.split_sections(content)
+    selected = readme_sections.select(all_sections, sections)
+    max_chars = max(MIN_README_CHUNK, max_chars or len(content) or MIN_README_CHUNK)
+    version = readme_sections.fingerprint(content)
+    index = 0
+    if cursor:
+        cursor_version, _, position = cursor.partition(":")
+        if cursor_version != version or not position.isdigit():
+            raise ValueError("the README changed or the cursor is invalid, start again without a cursor")
+        index = int(position)
+
+    # Only this chunk and whether there is a next one are needed
+    window = list(itertools.islice(readme_sections.chunks(selected, max_chars), index, index + 2))
+    chunk = window[0] if window else []
+    result = {
+        "content": "".join(section.text for section in chunk),
+        "toc": readme_sections.toc(all_sections),
+        "sections": list(dict.fromkeys(readme_sections.toc(chunk))),
+    }
+    if len(window) > 1:
+        result["next_cursor"] = f"{version}:{index + 1}"
+    return result
+
+
+async def _fetch_readme(github_url: str, sections: Optional[List[str]] = None, max_chars: Optional[int] = None,
+                        cursor: Optional[str] = None) -> str:
+    try:
+        found, status = await _find_readme(github_url)
+        if found is None:
             result = {
-                "status": f"error: could not locate README in '{github_url}' (tried raw fetch and API)",
+                "status": status,
                 "require_api_key": False,
                 "content": ""
             }
             return json.dumps(result)
 
+        raw_content = found.content
+
         # Scan for API-key patterns
-        require_api_key = bool(API_KEY_PATTERN_RE.search(raw_content))
+        require_api_key = bool(readme_digest.API_KEY_PATTERN_RE.search(raw_content))
 
         result = {
             "status": "success",
             "require_api_key": require_api_key,
-            "content": raw_content
         }
+        if sections or max_chars or cursor:
+            result.update(_readme_chunk(raw_content, sections, max_chars, cursor))
+        else:
+            result["content"] = raw_content
 
         if require_api_key:
             result[
@@ -530,6 +678,34 @@ def fetch_readme(github_url: str) -> str:
 # -----------------------------------------------------------------------------
 # 4. Run as a stdio MCP server
 # -----------------------------------------------------------------------------
+def create_app():
+    """
+    App factory for multi-worker serving (`--workers N`), called once in every
+    worker process. Each worker maps the same on-disk index, so the vectors are
+    shared through the page cache instead of being loaded N times.
+    """
+    # Consecutive requests of one session may land on different workers
+    mcp.settings.stateless_http = True
+    search_index.start_background_load()
+    search_index.start_watcher()
+    _landing_assets()
+
+    app = mcp.http_app()
+    session_lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(a):
+        async with session_lifespan(a):
+            try:
+                yield
+            finally:
+                await readme_fetcher.aclose_client()
+                tool_executor.shutdown()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
 if __name__ == "__main__":
     import argparse
 
@@ -539,21 +715,60 @@ if __name__ == "__main__":
         action="store_true",
         help="Run server locally via stdio instead of HTTP",
     )
+    parser.add_argument(
+        "--eager",
+        action="store_true",
+        help="Load the search index before accepting connections instead of in the background",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WORKERS", 1)),
+        help="Number of HTTP worker processes (default: $WORKERS or 1)",
+    )
     args = parser.parse_args()
 
-    if args.local:
-        # ---- Standard I/O server BLOCK ----
-        asyncio.run(
-            mcp.run_async(
-                transport="stdio",
-            )
+    if args.workers > 1 and not args.local:
+        # ---- Pre-fork HTTP server BLOCK ----
+        import uvicorn
+
+        # Build a missing index once here, not concurrently in every worker
+        search_index.ensure_index()
+        uvicorn.run(
+            "server:create_app",
+            factory=True,
+            host="0.0.0.0",
+            port=int(os.getenv("PORT", 8080)),
+            workers=args.workers,
+            timeout_graceful_shutdown=0,
         )
+        raise SystemExit
+
+    if args.eager:
+        search_index.load_now()
     else:
-        # ---- Streamable HTTP server BLOCK ----
-        asyncio.run(
-            mcp.run_async(
-                transport="streamable-http",
-                host="0.0.0.0",
-                port=int(os.getenv("PORT", 8080)),
-            )
-        )
\ No newline at end of file
+        search_index.start_background_load()
+    # Pick up indexes published by scrape.py / maintain.py without a restart
+    search_index.start_watcher()
+    if not args.local:
+        _landing_assets()
+
+    async def main():
+        try:
+            if args.local:
+                # ---- Standard I/O server BLOCK ----
+                await mcp.run_async(
+                    transport="stdio",
+                )
+            else:
+                # ---- Streamable HTTP server BLOCK ----
+                await mcp.run_async(
+                    transport="streamable-http",
+                    host="0.0.0.0",
+                    port=int(os.getenv("PORT", 8080)),
+                )
+        finally:
+            await readme_fetcher.aclose_client()
+            tool_executor.shutdown()
+
+    asyncio.run(main())
@@ -23,51 +23,31 @@ import os
 from pathlib import Path
 
 from fastmcp import FastMCP
-from fastapi.responses import FileResponse, PlainTextResponse
 from starlette.requests import Request
 
+from static_assets import get_assets
+
 mcp = FastMCP(name="1mcpserver", version="0.1.0")
 DOCS_DIR = Path(__file__).parent / "docs"
-
-
-def _file_or_404(p: Path):
-    if p.is_file():
-        # Add a tiny bit of caching for static assets
-        headers = {}
-        if any(part == "_next" for part in p.parts):
-            headers["Cache-Control"] = "public, max-age=31536000, immutable"
-        return FileResponse(p, headers=headers)
-    return PlainTextResponse("Not Found", status_code=404)
+assets = get_assets(DOCS_DIR)
 
 
 @mcp.custom_route("/", methods=["GET"])
-async def serve_root(_: Request):
-    return _file_or_404(DOCS_DIR / "index.html")
+async def serve_root(request: Request):
+    return assets.response("index.html", request.headers)
 
 @mcp.custom_route("/_next/{rest:path}", methods=["GET"])
 async def serve_next(request: Request):
-    if request is not None:
-        req = request.base_url
-        print(f"Got _next request: {req} requesting for url {request.url}")
     rest = request.path_params.get("rest", "")
-    print(request.path_params)
-    print(f"Serving _next file: {rest}")
-    return _file_or_404(DOCS_DIR / f"_next/{rest}")
+    return assets.response(f"_next/{rest}", request.headers)
 
 
 # Serve any other file that lives under docs/ (images, css, js, favicon, etc.)
 # e.g. /assets/logo.png, /robots.txt, /sitemap.xml, /favicon.ico
 @mcp.custom_route("/{rest:path}", methods=["GET"])
 async def serve_any(request: Request):
-    # Try exact file first
     rest = request.path_params.get("rest", "")
-    file_resp = _file_or_404(DOCS_DIR / rest)
-    if file_resp.status_code == 200:
-        return file_resp
-    # Optional SPA-style fallback: if you want unknown paths to render index.html
-    # (useful if you have client-side routing)
-    # return _file_or_404(_safe_path("index.html"))
-    return file_resp
+    return assets.response(rest, request.headers)
 
 if __name__ == "__main__":
     # Run the FastMCP server (includes our custom routes)
@@ -0,0 +1,46 @@
+"""
+Single-flight coalescing of identical concurrent lookups.
+
+When many sessions ask for the same thing at once (a trending server's README,
+the same quick_search query), the first caller runs the lookup and everyone
+arriving while it is in flight awaits that same call and gets its result or its
+exception. Nothing is kept once the call finishes; caching is left to the
+layers below (ReadmeCache, the cursor cache).
+
+The shared call runs as its own task, so a caller that gives up (client gone,
+timeout) cancels only its own wait, never the lookup the others are waiting on.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+import metrics
+
+COALESCED = metrics.Counter(
+    "mcp_coalesced_calls_total", "Calls served by joining an identical in-flight call", ("flight",)
+)
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable], *args, **kwargs):
+        """
+        Await `fn(*args, **kwargs)`, or the call already in flight for `key`.
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+            COALESCED.inc(flight=self.name)
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "calls": self.calls, "coalesced": self.coalesced}
@@ -0,0 +1,146 @@
+"""
+In-memory static files for the landing page (docs/).
+
+Every file under the root is read once, together with gzip and, when the optional
+`brotli` package is installed, brotli variants of the compressible ones, so serving
+an asset is a dict lookup: no stat, no open, no compression per request. Responses
+carry a strong ETag per encoding and If-None-Match gets a 304.
+
+Only files found at load time are served, so a path can never resolve outside the
+root (`..`, absolute paths and symlinks out of it simply are not in the table).
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from starlette.responses import PlainTextResponse, Response
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Files smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+BROTLI_QUALITY = int(os.getenv("STATIC_BROTLI_QUALITY", 11))
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# index.html and friends change on deploy without changing their name
+REVALIDATE = "public, max-age=0, must-revalidate"
+
+
+class Variant(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class Asset(NamedTuple):
+    media_type: str
+    cache_control: str
+    variants: Dict[str, Variant]  # content-coding ("identity", "br", "gzip") -> body
+
+
+def _accepted(header: str) -> Dict[str, float]:
+    """
+    Accept-Encoding as {coding: q}.
+    """
+    accepted = {}
+    for part in header.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding] = q
+    return accepted
+
+
+class StaticAssets:
+    def __init__(self, root: Path):
+        self.root = root
+        self.assets: Dict[str, Asset] = {}
+        self.bytes = 0
+        self.load()
+
+    def load(self):
+        started = time.perf_counter()
+        assets, total = {}, 0
+        root = self.root.resolve()
+        for path in sorted(root.rglob("*")):
+            if not path.is_file() or root not in path.resolve().parents:
+                continue
+            rel = path.relative_to(root).as_posix()
+            body = path.read_bytes()
+            media_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+            digest = hashlib.sha1(body).hexdigest()[:16]
+            variants = {"identity": Variant(body, f'"{digest}"')}
+            if len(body) >= MIN_COMPRESS_BYTES and media_type.startswith(COMPRESSIBLE):
+                compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    compressed["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+                for coding, data in compressed.items():
+                    if len(data) < len(body):
+                        variants[coding] = Variant(data, f'"{digest}-{coding}"')
+            cache_control = IMMUTABLE if rel.startswith("_next/") else REVALIDATE
+            assets[rel] = Asset(media_type, cache_control, variants)
+            total += sum(len(v.body) for v in variants.values())
+        self.assets, self.bytes = assets, total
+        print(f"Loaded {len(assets)} static files ({total / 1e6:.1f} MB with compressed copies) "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    def get(self, path: str) -> Optional[Asset]:
+        return self.assets.get(path.lstrip("/"))
+
+    def response(self, path: str, headers) -> Response:
+        """
+        The asset at `path` (relative to the root) for a request with `headers`,
+        a 304 if the client's copy is current, or a 404.
+        """
+        asset = self.get(path)
+        if asset is None:
+            return PlainTextResponse("Not Found", status_code=404)
+
+        accepted = _accepted(headers.get("accept-encoding", ""))
+        coding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and accepted.get(candidate, 0) > 0:
+                coding = candidate
+                break
+        variant = asset.variants[coding]
+        response_headers = {"ETag": variant.etag, "Cache-Control": asset.cache_control}
+        if len(asset.variants) > 1:
+            response_headers["Vary"] = "Accept-Encoding"
+        if coding != "identity":
+            response_headers["Content-Encoding"] = coding
+
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or variant.etag in
+                              [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=response_headers)
+        return Response(variant.body, media_type=asset.media_type, headers=response_headers)
+
+    def stats(self) -> dict:
+        return {"files": len(self.assets), "bytes": self.bytes, "brotli": brotli is not None}
+
+
+_loaded: Dict[Path, StaticAssets] = {}
+_lock = threading.Lock()
+
+
+def get_assets(root: Path) -> StaticAssets:
+    """
+    The assets under `root`, loaded on first use.
+    """
+    with _lock:
+        if root not in _loaded:
+            _loaded[root] = StaticAssets(root)
+        return _loaded[root]
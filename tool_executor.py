@@ -0,0 +1,175 @@
+"""
+Request execution layer for the MCP tools.
+
+Blocking tool bodies (search, JSON validation) run on one bounded thread pool
+instead of on the event loop, so a slow call no longer stalls every other session.
+Each tool also has its own concurrency limit and a bounded number of callers that
+may wait for a slot; beyond that the call is rejected right away with a 503
+instead of piling up (backpressure).
+
+Limits come from the environment:
+  - TOOL_THREADS: size of the shared thread pool
+  - TOOL_LIMIT_<TOOL>: concurrent calls of one tool, e.g. TOOL_LIMIT_QUICK_SEARCH=8
+  - TOOL_QUEUE_<TOOL> / TOOL_QUEUE_DEPTH: callers allowed to wait per tool
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from fastapi import HTTPException
+
+import metrics
+
+TOOL_THREADS = int(os.getenv("TOOL_THREADS", 16))
+QUEUE_DEPTH = int(os.getenv("TOOL_QUEUE_DEPTH", 64))
+DEFAULT_LIMITS = {
+    "quick_search": 8,
+    "batch_search": 4,
+    "server_details": 16,
+    "fetch_readme": 32,
+    "validate_mcp_config": 8,
+}
+BUSY_DETAIL = "The server is busy, please retry shortly."
+
+CALLS = metrics.Counter("mcp_tool_calls_total", "Tool calls by outcome (ok, error, rejected)", ("tool", "outcome"))
+WAIT_SECONDS = metrics.Histogram("mcp_tool_wait_seconds", "Time a tool call waited for a slot", ("tool",))
+RUN_SECONDS = metrics.Histogram("mcp_tool_run_seconds", "Time a tool call ran, after getting a slot", ("tool",))
+
+
+class ToolLimiter:
+    """
+    Concurrency limit, wait queue and timing counters of one tool.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_depth: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self._slots = asyncio.Semaphore(concurrency)
+        self.running = 0
+        self.waiting = 0
+        self.calls = 0
+        self.rejected = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """
+        Hold one of the tool's slots for the duration of the block.
+        Raises HTTPException(503) if the tool is saturated and its queue is full.
+        """
+        if self._slots.locked() and self.waiting >= self.queue_depth:
+            self.rejected += 1
+            CALLS.inc(tool=self.name, outcome="rejected")
+            raise HTTPException(status_code=503, detail=BUSY_DETAIL)
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self._record_wait(started - queued_at)
+        self.running += 1
+        token = metrics.current_tool.set(self.name)
+        outcome = "ok"
+        try:
+            yield
+        except Exception:
+            self.errors += 1
+            outcome = "error"
+            raise
+        finally:
+            metrics.current_tool.reset(token)
+            self.running -= 1
+            self._slots.release()
+            self._record_run(time.perf_counter() - started)
+            CALLS.inc(tool=self.name, outcome=outcome)
+
+    def _record_wait(self, seconds: float):
+        self.calls += 1
+        self.wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+        WAIT_SECONDS.observe(seconds, tool=self.name)
+
+    def _record_run(self, seconds: float):
+        self.run_seconds += seconds
+        self.max_run_seconds = max(self.max_run_seconds, seconds)
+        RUN_SECONDS.observe(seconds, tool=self.name)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self.queue_depth,
+            "running": self.running,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "avg_wait_ms": 1000 * self.wait_seconds / self.calls if self.calls else 0.0,
+            "max_wait_ms": 1000 * self.max_wait_seconds,
+            "avg_run_ms": 1000 * self.run_seconds / self.calls if self.calls else 0.0,
+            "max_run_ms": 1000 * self.max_run_seconds,
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_limiters: Dict[str, ToolLimiter] = {}
+
+
+def get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="tool")
+        return _pool
+
+
+def limiter(tool: str) -> ToolLimiter:
+    if tool not in _limiters:
+        key = tool.upper()
+        concurrency = int(os.getenv(f"TOOL_LIMIT_{key}", DEFAULT_LIMITS.get(tool, TOOL_THREADS)))
+        queue_depth = int(os.getenv(f"TOOL_QUEUE_{key}", QUEUE_DEPTH))
+        _limiters[tool] = ToolLimiter(tool, concurrency, queue_depth)
+    return _limiters[tool]
+
+
+def limit(tool: str):
+    """
+    `async with limit("fetch_readme"):` for tools that are async already.
+    """
+    return limiter(tool).slot()
+
+
+async def run(tool: str, fn: Callable, *args, **kwargs):
+    """
+    Run the blocking `fn(*args, **kwargs)` on the tool thread pool, within `tool`'s limits.
+    """
+    async with limit(tool):
+        loop = asyncio.get_running_loop()
+        # Carry current_tool (and any other context) over to the worker thread
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(get_pool(), functools.partial(ctx.run, fn, *args, **kwargs))
+
+
+def stats() -> dict:
+    return {name: lim.stats() for name, lim in sorted(_limiters.items())}
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,346 @@
+"""
+Pickle-free, memory-mapped vector index stored in one version directory:
+
+    vectors.npy          float32 matrix, row i is the embedding of item i
+    norms.npy            squared L2 norm of every row, precomputed at build time
+    meta.db              SQLite table items(id, server_id, name, description, url), id = row,
+                         server_id = id of the row in the catalogue's servers table
+    ann.faiss, ann.json  optional approximate index over the same rows (see below)
+
+Loading maps the .npy files read-only instead of reading them, so startup does not
+depend on the catalogue size and every worker process on a machine shares one copy
+of the vectors through the page cache. Metadata is looked up by row id only for the
+rows a search returns. Nothing is unpickled.
+
+Distances are squared L2, the same metric as the FAISS flat index used before.
+
+INDEX_TYPE picks how large catalogues are searched:
+  - "flat" (default): exact brute force over vectors.npy
+  - "hnsw": HNSW graph over 8-bit scalar-quantized vectors
+  - "ivfpq": inverted file with product quantization (smallest, d/8 bytes per vector)
+  - "ivfsq": inverted file with 8-bit scalar quantization (d bytes per vector)
+The approximate indexes return ANN_RERANK times more candidates than asked for,
+which are then re-ranked with exact distances from vectors.npy. Below ANN_MIN_ROWS
+rows exact search is fast enough and the flat index is used regardless.
+
+Searches take an optional boolean row mask (see attributes.py) and only return rows
+it allows. The mask is applied during the search, not to its results: exact search
+skips or gathers only the allowed rows, and the approximate indexes get it as a FAISS
+ID selector. A mask allowing fewer than ANN_MIN_ROWS rows is searched exactly.
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"
+NORMS_FILE = "norms.npy"
+META_FILE = "meta.db"
+ANN_FILE = "ann.faiss"
+ANN_META_FILE = "ann.json"
+# Rows copied per step when writing, bounds memory for large catalogues
+WRITE_CHUNK = 8192
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq", "ivfsq")
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat").lower()
+ANN_MIN_ROWS = int(os.getenv("ANN_MIN_ROWS", 10000))
+ANN_RERANK = int(os.getenv("ANN_RERANK", 4))
+# Build-time parameters
+HNSW_M = int(os.getenv("HNSW_M", 32))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", 200))
+IVF_NLIST = int(os.getenv("IVF_NLIST", 0))  # 0: about 4 * sqrt(rows)
+PQ_M = int(os.getenv("PQ_M", 0))  # 0: one sub-quantizer per 8 dimensions
+# Search-time parameters, read when an index is loaded
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", 128))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", 64))
+# k-means on more rows than this gains little recall and costs a lot of build time
+ANN_TRAIN_ROWS = 100_000
+
+
+def exists(path: str) -> bool:
+    return all(os.path.isfile(os.path.join(path, f)) for f in (VECTORS_FILE, NORMS_FILE, META_FILE))
+
+
+class VectorIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        self.norms = np.load(os.path.join(path, NORMS_FILE), mmap_mode="r")
+        # Version directories are never modified once published
+        self._conn = sqlite3.connect(
+            f"file:{os.path.join(path, META_FILE)}?mode=ro&immutable=1", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self.ann = None
+        self.index_type = "flat"
+        self.rerank = ANN_RERANK
+        ann_meta = os.path.join(path, ANN_META_FILE)
+        if os.path.isfile(ann_meta):
+            import faiss
+
+            with open(ann_meta, encoding="utf-8") as f:
+                self.index_type = json.load(f)["type"]
+            # Inverted lists are mapped rather than read, like the .npy files
+            self.ann = faiss.read_index(os.path.join(path, ANN_FILE), faiss.IO_FLAG_MMAP)
+            set_search_params(self.ann, self.index_type)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def search(self, queries: np.ndarray, top_k: int,
+               mask: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Nearest neighbours for each row of `queries`, exact for the flat index type.
+        `mask`, a boolean array with one entry per row, restricts the search to the
+        rows it allows.
+        Returns one list of (row id, squared distance) pairs per query, nearest first.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.ann is not None and (mask is None or np.count_nonzero(mask) >= ANN_MIN_ROWS):
+            return self._search_ann(queries, top_k, mask)
+        return self._search_exact(queries, top_k, mask)
+
+    def _search_params(self, mask: np.ndarray):
+        import faiss
+
+        bits = np.packbits(mask, bitorder="little")
+        selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bits))
+        if self.index_type == "hnsw":
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=HNSW_EF_SEARCH)
+        else:
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=IVF_NPROBE)
+        # The selector only points at the bitmap, keep it alive for the search
+        return params, bits
+
+    def _search_ann(self, queries: np.ndarray, top_k: int,
+                    mask: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        candidates = max(top_k * self.rerank, top_k)
+        if mask is None:
+            distances, ids = self.ann.search(queries, candidates)
+        else:
+            params, _bits = self._search_params(mask)
+            distances, ids = self.ann.search(queries, candidates, params=params)
+        results = []
+        for query, row_ids, row_dist in zip(queries, ids, distances):
+            keep = row_ids >= 0
+            row_ids = row_ids[keep]
+            if self.rerank > 1 and len(row_ids):
+                # Exact distances for the candidates; a few random reads from the mapped file
+                order = np.argsort(row_ids)
+                exact = self.norms[row_ids[order]] - 2.0 * (self.vectors[row_ids[order]] @ query) + query @ query
+                row_dist = np.empty_like(exact)
+                row_dist[order] = exact
+            else:
+                row_dist = row_dist[keep]
+            top = np.argsort(row_dist)[:top_k]
+            results.append([(int(row_ids[i]), float(row_dist[i])) for i in top])
+        return results
+
+    def _search_exact(self, queries: np.ndarray, top_k: int,
+                      mask: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        vectors, norms, rows = self.vectors, self.norms, None
+        allowed = len(self)
+        if mask is not None:
+            allowed = int(np.count_nonzero(mask))
+            if allowed <= len(self) // 4:
+                # Selective filter: only read the allowed rows
+                rows = np.flatnonzero(mask)
+                vectors, norms = self.vectors[rows], self.norms[rows]
+        top_k = min(top_k, allowed)
+        if top_k <= 0:
+            return [[] for _ in queries]
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2
+        dist = norms[:, None] - 2.0 * (vectors @ queries.T) + np.einsum("ij,ij->i", queries, queries)
+        if mask is not None and rows is None:
+            dist[~mask] = np.inf
+        n = dist.shape[0]
+        results = []
+        for col in dist.T:
+            top = np.argpartition(col, top_k - 1)[:top_k] if top_k < n else np.arange(n)
+            top = top[np.argsort(col[top])]
+            ids = top if rows is None else rows[top]
+            results.append([(int(i), float(col[j])) for i, j in zip(ids, top)])
+        return results
+
+    def entries(self, ids: Sequence[int]) -> List[dict]:
+        """
+        Metadata dicts (name, description, url) for the given row ids, in the same order.
+        """
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, name, description, url FROM items WHERE id IN ({placeholders})", list(ids)
+            ).fetchall()
+        by_id = {row[0]: {"name": row[1], "description": row[2], "url": row[3]} for row in rows}
+        return [by_id[i] for i in ids]
+
+    def names(self) -> List[str]:
+        """
+        Item names in row order.
+        """
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT name FROM items ORDER BY id")]
+
+    def server_ids(self) -> Optional[List[int]]:
+        """
+        Catalogue ids (servers.id) in row order, or None for an index written before
+        they were stored.
+        """
+        with self._lock:
+            try:
+                return [row[0] for row in self._conn.execute("SELECT server_id FROM items ORDER BY id")]
+            except sqlite3.OperationalError:
+                return None
+
+    def close(self):
+        self._conn.close()
+
+
+def write_index(path: str, rows: Sequence[Tuple[int, str, str, str]], dim: int, blocks: Iterable[np.ndarray]):
+    """
+    Write an index to the (empty) directory `path`.
+
+    Args:
+        rows: (server id, name, description, url) per item, in row order.
+        dim: embedding dimension.
+        blocks: arrays of vectors that, concatenated, line up with `rows`. Written one
+            block at a time, so they can be slices of another memory-mapped index.
+    """
+    vectors = np.lib.format.open_memmap(
+        os.path.join(path, VECTORS_FILE), mode="w+", dtype=np.float32, shape=(len(rows), dim)
+    )
+    norms = np.lib.format.open_memmap(
+        os.path.join(path, NORMS_FILE), mode="w+", dtype=np.float32, shape=(len(rows),)
+    )
+    start = 0
+    for block in blocks:
+        block = np.asarray(block, dtype=np.float32)
+        end = start + len(block)
+        vectors[start:end] = block
+        norms[start:end] = np.einsum("ij,ij->i", block, block)
+        start = end
+    if start != len(rows):
+        raise ValueError(f"Got {start} vectors for {len(rows)} rows")
+    vectors.flush()
+    norms.flush()
+    del vectors, norms
+
+    conn = sqlite3.connect(os.path.join(path, META_FILE))
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, server_id INTEGER UNIQUE, name TEXT, "
+                 "description TEXT, url TEXT)")
+    conn.executemany(
+        "INSERT INTO items (id, server_id, name, description, url) VALUES (?, ?, ?, ?, ?)",
+        ((i, server_id, name, desc, url) for i, (server_id, name, desc, url) in enumerate(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def effective_type(rows: int, index_type: str = INDEX_TYPE) -> str:
+    """
+    The index type actually built for a catalogue of `rows` rows.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown INDEX_TYPE '{index_type}', expected one of {', '.join(INDEX_TYPES)}")
+    return "flat" if rows < ANN_MIN_ROWS else index_type
+
+
+def ann_params(rows: int, dim: int, index_type: str) -> dict:
+    if index_type == "hnsw":
+        return {"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION}
+    # FAISS wants at least 39 training points per list
+    params = {"nlist": IVF_NLIST or max(1, min(int(4 * math.sqrt(rows)), rows // 39))}
+    if index_type == "ivfpq":
+        # Sub-quantizers must divide the dimension
+        m = PQ_M or max(1, dim // 8)
+        while dim % m:
+            m -= 1
+        params["m"] = m
+    return params
+
+
+def create_ann(index_type: str, vectors: np.ndarray, params: Optional[dict] = None):
+    """
+    Train (on a sample) and fill an approximate index over `vectors`; ids are row numbers.
+    """
+    import faiss
+
+    rows, dim = vectors.shape
+    params = params or ann_params(rows, dim, index_type)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, params["m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+    elif index_type == "ivfpq":
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, params["nlist"], params["m"], 8)
+    elif index_type == "ivfsq":
+        index = faiss.IndexIVFScalarQuantizer(
+            faiss.IndexFlatL2(dim), dim, params["nlist"], faiss.ScalarQuantizer.QT_8bit
+        )
+    else:
+        raise ValueError(f"No approximate index for INDEX_TYPE '{index_type}'")
+
+    if rows > ANN_TRAIN_ROWS:
+        sample = np.sort(np.random.default_rng(0).choice(rows, ANN_TRAIN_ROWS, replace=False))
+        index.train(np.ascontiguousarray(vectors[sample]))
+    else:
+        index.train(np.ascontiguousarray(vectors[:]))
+    for start in range(0, rows, WRITE_CHUNK):
+        index.add(np.ascontiguousarray(vectors[start:start + WRITE_CHUNK]))
+    return index
+
+
+def type_matches(path: str, index_type: str = INDEX_TYPE) -> bool:
+    """
+    Whether the index in `path` is of the type that would be built for it now.
+    """
+    built = "flat"
+    try:
+        with open(os.path.join(path, ANN_META_FILE), encoding="utf-8") as f:
+            built = json.load(f)["type"]
+    except FileNotFoundError:
+        pass
+    rows = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r").shape[0]
+    return built == effective_type(rows, index_type)
+
+
+def set_search_params(index, index_type: str):
+    if index_type == "hnsw":
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif index_type in ("ivfpq", "ivfsq"):
+        index.nprobe = IVF_NPROBE
+
+
+def build_ann(path: str, index_type: str = INDEX_TYPE) -> str:
+    """
+    Add the approximate index selected by `index_type` to the index in `path`
+    (nothing for the flat type or small catalogues). Returns the type built.
+    """
+    import faiss
+
+    vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+    index_type = effective_type(len(vectors), index_type)
+    if index_type == "flat":
+        return index_type
+    params = ann_params(*vectors.shape, index_type)
+    faiss.write_index(create_ann(index_type, vectors, params), os.path.join(path, ANN_FILE))
+    with open(os.path.join(path, ANN_META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"type": index_type, **params}, f)
+    return index_type
+
+
+def chunks(vectors: np.ndarray, ids: Sequence[int], size: int = WRITE_CHUNK):
+    """
+    Yield vectors[ids] a chunk at a time, without materializing all of it.
+    """
+    for start in range(0, len(ids), size):
+        yield vectors[np.asarray(ids[start:start + size], dtype=np.int64)]